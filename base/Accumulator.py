@@ -0,0 +1,133 @@
+import chess
+
+# Incrementally updated material and piece-square sums. A bot declares its
+# piece values and tables once; the search then adjusts the totals for the
+# few pieces each move touches instead of evaluate() rescanning the board.
+#
+# Values and tables are split by game phase the same way the bundled bots
+# write them: [base, beginning, middle, end]. Each total is kept as four
+# separate sums, so blending with the phase weights can happen in evaluate().
+# Tables are 64 entries from White's side (a1 first); Black reads them
+# mirrored (square ^ 56).
+
+PHASES = 4
+MATERIAL = 0                # offsets within one colour's block of the state
+PST = MATERIAL + PHASES
+COUNTS = PST + PHASES       # COUNTS + piece_type, index COUNTS + 0 is unused
+STRIDE = COUNTS + 7
+
+
+def material(state, color):
+    """Phase-split material sum [base, beginning, middle, end] for `color`."""
+    start = color * STRIDE + MATERIAL
+    return state[start:start + PHASES]
+
+
+def pst(state, color):
+    """Phase-split piece-square sum for `color`."""
+    start = color * STRIDE + PST
+    return state[start:start + PHASES]
+
+
+def count(state, color, piece_type):
+    return state[color * STRIDE + COUNTS + piece_type]
+
+
+def blend(sums, weights):
+    """sums[0] + sums[1] * weights[1] + ... with weights [1, beginning, middle, end]."""
+    return sums[0] + sums[1] * weights[1] + sums[2] * weights[2] + sums[3] * weights[3]
+
+
+class Accumulator:
+    """
+    Stack of evaluation states, one per ply of the search path. Call
+    reset() at the root, push() before each move is made, push_null() for
+    null moves and pop() after each unmake.
+    """
+
+    def __init__(self, material_values=None, pst_tables=None):
+        material_values = material_values or {}
+        pst_tables = pst_tables or {}
+
+        # FEATURES[color][piece_type][square]: (index, value) pairs a piece adds to the state
+        self.features = [[[[] for _ in chess.SQUARES] for _ in range(7)] for _ in chess.COLORS]
+        for color in chess.COLORS:
+            base = color * STRIDE
+            for piece_type in chess.PIECE_TYPES:
+                values = material_values.get(piece_type)
+                tables = pst_tables.get(piece_type)
+                for square in chess.SQUARES:
+                    feature = [(base + COUNTS + piece_type, 1)]
+                    if values is not None:
+                        feature += [(base + MATERIAL + i, v) for i, v in enumerate(values) if v]
+                    if tables is not None:
+                        index = square if color == chess.WHITE else square ^ 56
+                        feature += [(base + PST + i, t[index]) for i, t in enumerate(tables) if t[index]]
+                    self.features[color][piece_type][square] = feature
+
+        self.stack = []
+
+    def compute(self, board):
+        """The state for `board` from scratch."""
+        state = [0] * (2 * STRIDE)
+        for color in chess.COLORS:
+            features = self.features[color]
+            for piece_type in chess.PIECE_TYPES:
+                for square in chess.scan_forward(board.pieces_mask(piece_type, color)):
+                    for index, value in features[piece_type][square]:
+                        state[index] += value
+        return state
+
+    @property
+    def state(self):
+        return self.stack[-1]
+
+    def reset(self, board):
+        self.stack = [self.compute(board)]
+
+    def push(self, board, move):
+        """Applies `move`; must be called on the board *before* it is pushed."""
+        state = self.stack[-1].copy()
+        from_square = move.from_square
+        to_square = move.to_square
+        color = board.turn
+        features = self.features[color]
+        piece_type = board.piece_type_at(from_square)
+
+        def toggle(feature, sign):
+            for index, value in feature:
+                state[index] += sign * value
+
+        if piece_type == chess.KING and (board.occupied_co[color] & chess.BB_SQUARES[to_square]
+                                         or abs(to_square - from_square) == 2):
+            # castling, either as e1g1 or as king-takes-own-rook
+            if board.occupied_co[color] & chess.BB_SQUARES[to_square]:
+                rook_from = to_square
+            else:
+                rook_from = from_square + 3 if to_square > from_square else from_square - 4
+            rank = from_square & ~7
+            if rook_from > from_square:
+                king_to, rook_to = rank + 6, rank + 5
+            else:
+                king_to, rook_to = rank + 2, rank + 3
+            toggle(features[chess.KING][from_square], -1)
+            toggle(features[chess.KING][king_to], 1)
+            toggle(features[chess.ROOK][rook_from], -1)
+            toggle(features[chess.ROOK][rook_to], 1)
+        else:
+            captured = board.piece_type_at(to_square)
+            if captured:
+                toggle(self.features[not color][captured][to_square], -1)
+            elif piece_type == chess.PAWN and to_square == board.ep_square and (to_square - from_square) & 7:
+                captured_square = to_square - 8 if color == chess.WHITE else to_square + 8
+                toggle(self.features[not color][chess.PAWN][captured_square], -1)
+            toggle(features[piece_type][from_square], -1)
+            toggle(features[move.promotion or piece_type][to_square], 1)
+
+        self.stack.append(state)
+
+    def push_null(self):
+        self.stack.append(self.stack[-1])
+
+    def pop(self):
+        self.stack.pop()
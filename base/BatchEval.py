@@ -0,0 +1,69 @@
+import chess
+
+import base.Accumulator as Accumulator
+
+try:
+    import numpy as np
+except ImportError:  # batched evaluation is optional; callers fall back to one board at a time
+    np = None
+
+# Vectorised material / piece-square totals for many boards at once. The
+# boards are stacked into an (N, 12, 64) array of piece bits (plane
+# color * 6 + piece_type - 1, Black first like everywhere else in base/) and
+# scored against the same values and tables a bot gives the Accumulator,
+# producing the same per-board states Accumulator.compute() would.
+
+PLANES = [(color, piece_type) for color in (chess.BLACK, chess.WHITE) for piece_type in chess.PIECE_TYPES]
+
+
+def available():
+    return np is not None
+
+
+def stack(boards):
+    """(N, 12) uint64 piece bitboards."""
+    return np.array([[board.pieces_mask(piece_type, color) for color, piece_type in PLANES] for board in boards],
+                    dtype="<u8")
+
+
+def unpack(bitboards):
+    """(N, 12) bitboards -> (N, 12, 64) array of 0/1, indexed by square."""
+    n = len(bitboards)
+    return np.unpackbits(bitboards.view(np.uint8).reshape(n, 12, 8), axis=2, bitorder="little")
+
+
+class BatchTables:
+
+    def __init__(self, material_values=None, pst_tables=None):
+        material_values = material_values or {}
+        pst_tables = pst_tables or {}
+        phases = Accumulator.PHASES
+
+        # values[plane, phase] and tables[plane, square, phase]
+        self.values = np.zeros((12, phases))
+        self.tables = np.zeros((12, 64, phases))
+        for plane, (color, piece_type) in enumerate(PLANES):
+            if piece_type in material_values:
+                self.values[plane] = material_values[piece_type]
+            if piece_type in pst_tables:
+                table = np.array(pst_tables[piece_type], dtype=float).T  # (64, phases)
+                if color == chess.BLACK:
+                    table = table[np.arange(64) ^ 56]
+                self.tables[plane] = table
+
+    def states(self, boards):
+        """Accumulator states (see base/Accumulator.py) for every board, as lists."""
+        bits = unpack(stack(boards))
+        counts = bits.sum(axis=2, dtype=np.int64)                      # (N, 12)
+        material = counts[:, :, None] * self.values                       # (N, 12, phases)
+        pst = np.einsum("nps,psf->npf", bits, self.tables, optimize=True)  # (N, 12, phases)
+
+        n = len(boards)
+        states = np.zeros((n, 2 * Accumulator.STRIDE))
+        for color in chess.COLORS:
+            planes = slice(color * 6, color * 6 + 6)
+            base = color * Accumulator.STRIDE
+            states[:, base + Accumulator.MATERIAL:base + Accumulator.PST] = material[:, planes].sum(axis=1)
+            states[:, base + Accumulator.PST:base + Accumulator.COUNTS] = pst[:, planes].sum(axis=1)
+            states[:, base + Accumulator.COUNTS + 1:base + Accumulator.STRIDE] = counts[:, planes]
+        return states.tolist()
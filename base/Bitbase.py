@@ -0,0 +1,517 @@
+import argparse
+import array
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import time
+
+import chess
+
+import base.Zobrist as Zobrist
+
+# Endgame bitbases for 3- and 4-piece material sets, built offline by
+# retrograde analysis and probed from memory-mapped files.
+#
+# A table such as "KQvKR" holds one signed byte per position, from the side
+# to move's point of view:
+#
+#     0       draw (or a position that can't occur)
+#     +n      win, mate in n - 1 plies
+#     -n      loss, mated in n - 1 plies (-1: checkmated now)
+#
+# Distances stop at 126 plies; longer wins are stored as 127 / -127.
+#
+# The first side of a name ("KQ" in "KQvKR") is stored as White. Positions
+# with the colours the other way round are flipped before lookup. Pawnless
+# tables keep only White's king in the a1-d1-d4 triangle, and tables with
+# pawns only White's king on the a-d files. The other positions are
+# mirrors of these.
+#
+# Tables only cover positions without castling rights or an en passant
+# capture. When generating, the en passant right after a double pawn push
+# is ignored, which only matters for tables with pawns on both sides.
+#
+#     python -m base.Bitbase generate KQvK KRvK KPvK     # into bitbases/, smaller tables first
+#     python -m base.Bitbase probe "8/8/8/4k3/8/8/8/4KQ2 w - - 0 1"
+
+DIRECTORY = "bitbases"
+MAX_PIECES = 4
+SUFFIX = ".bb"
+
+MAGIC = b"CHBB"
+FILE_VERSION = 1
+# magic, file version, table name
+HEADER = struct.Struct("<4sH10s")
+HEADER_BYTES = 16
+
+DTM_LIMIT = 126
+
+PIECE_ORDER = "QRBNP"
+PIECE_VALUE = {"Q": 9, "R": 5, "B": 3, "N": 3, "P": 1}
+PIECE_TYPE = {symbol: chess.PIECE_SYMBOLS.index(symbol.lower()) for symbol in PIECE_ORDER}
+
+# ---------------- symmetry ----------------
+
+def _transform(square, t):
+    file, rank = square & 7, square >> 3
+    if t & 4:
+        file, rank = rank, file
+    if t & 1:
+        file = 7 - file
+    if t & 2:
+        rank = 7 - rank
+    return rank * 8 + file
+
+# TRANSFORMS[t][square], the 8 symmetries of the board
+TRANSFORMS = [[_transform(square, t) for square in chess.SQUARES] for t in range(8)]
+
+TRIANGLE = [chess.A1, chess.B1, chess.C1, chess.D1, chess.B2, chess.C2, chess.D2, chess.C3, chess.D3, chess.D4]
+TRIANGLE_INDEX = {square: i for i, square in enumerate(TRIANGLE)}
+HALF = [square for square in chess.SQUARES if square & 7 < 4]
+HALF_INDEX = {square: i for i, square in enumerate(HALF)}
+
+# CANONICAL[pawns][square]: the transform that brings a white king on `square` into its region
+CANONICAL = [
+    [next(t for t in range(8) if TRANSFORMS[t][square] in TRIANGLE_INDEX) for square in chess.SQUARES],
+    [0 if square & 7 < 4 else 1 for square in chess.SQUARES],
+]
+
+
+# ---------------- values ----------------
+
+def dtm(value):
+    """Plies to mate for a win or loss value, None for a draw."""
+    return abs(value) - 1 if value else None
+
+
+def encode(sign, plies):
+    return sign * min(plies + 1, DTM_LIMIT + 1)
+
+
+def parent_value(value):
+    """The value of a move for the side playing it, given the value of the position it leads to."""
+    if value > 0:
+        return -min(value + 1, DTM_LIMIT + 1)
+    if value < 0:
+        return min(-value + 1, DTM_LIMIT + 1)
+    return 0
+
+
+# ---------------- material ----------------
+
+def side_key(pieces):
+    return sum(PIECE_VALUE[p] for p in pieces), "".join(sorted(pieces, key=PIECE_ORDER.index))
+
+
+def table_name(white, black):
+    """
+    Canonical table name for White's and Black's non-king pieces (as
+    strings of letters), and whether the colours have to be swapped.
+    """
+    white_key, black_key = side_key(white), side_key(black)
+    flip = black_key > white_key
+    if flip:
+        white_key, black_key = black_key, white_key
+    return f"K{white_key[1]}vK{black_key[1]}", flip
+
+
+class Material:
+    """
+    The layout of one table: piece list [white king, black king, white
+    pieces..., black pieces...], and position <-> index conversion.
+    """
+
+    def __init__(self, name):
+        white, _, black = name.partition("v")
+        if not white.startswith("K") or not black.startswith("K"):
+            raise ValueError(f"Bad table name: {name}")
+        self.white = white[1:]
+        self.black = black[1:]
+        if table_name(self.white, self.black) != (name, False):
+            raise ValueError(f"{name} is not a canonical table name ({table_name(self.white, self.black)[0]})")
+        self.name = name
+        self.pieces = ([(chess.WHITE, chess.KING), (chess.BLACK, chess.KING)]
+                       + [(chess.WHITE, PIECE_TYPE[p]) for p in self.white]
+                       + [(chess.BLACK, PIECE_TYPE[p]) for p in self.black])
+        self.count = len(self.pieces)
+        if self.count > MAX_PIECES:
+            raise ValueError(f"{name} has more than {MAX_PIECES} pieces")
+        self.pawns = "P" in self.white + self.black
+        self.king_squares = HALF if self.pawns else TRIANGLE
+        self.king_index = HALF_INDEX if self.pawns else TRIANGLE_INDEX
+        self.block = 64 ** (self.count - 1)
+        self.side_size = len(self.king_squares) * self.block
+        self.size = 2 * self.side_size
+
+    def index(self, turn, squares):
+        """Index of a position given as `squares` in piece-list order (any orientation)."""
+        t = CANONICAL[self.pawns][squares[0]]
+        if t:
+            transform = TRANSFORMS[t]
+            squares = [transform[square] for square in squares]
+        index = self.king_index[squares[0]]
+        for square in squares[1:]:
+            index = index * 64 + square
+        return (0 if turn == chess.WHITE else self.side_size) + index
+
+    def decode(self, index):
+        """(turn, squares) for an index."""
+        turn = chess.WHITE if index < self.side_size else chess.BLACK
+        index %= self.side_size
+        squares = []
+        for _ in range(self.count - 1):
+            index, square = divmod(index, 64)
+            squares.append(square)
+        squares.append(self.king_squares[index])
+        squares.reverse()
+        return turn, squares
+
+    def dependencies(self):
+        """Names of the tables a capture or promotion can lead to."""
+        names = set()
+        for side, other in ((self.white, self.black), (self.black, self.white)):
+            for i, piece in enumerate(side):
+                rest = side[:i] + side[i + 1:]
+                # captures of this piece
+                white, black = (rest, other) if side is self.white else (other, rest)
+                names.add(table_name(white, black)[0])
+                if piece == "P":
+                    for promoted in "QRBN":
+                        white, black = (rest + promoted, other) if side is self.white else (other, rest + promoted)
+                        names.add(table_name(white, black)[0])
+        return sorted(name for name in names if not insufficient(name))
+
+
+def insufficient(name):
+    """Material where neither side can mate (no table needed: always a draw)."""
+    white, _, black = name.partition("v")
+    pieces = white[1:] + black[1:]
+    return pieces in ("", "B", "N")
+
+
+def board_material(board):
+    """(table name, flip, [(color, piece_type, square)]) for a board."""
+    pieces = []
+    letters = {chess.WHITE: "", chess.BLACK: ""}
+    for piece_type, bb in ((chess.QUEEN, board.queens), (chess.ROOK, board.rooks), (chess.BISHOP, board.bishops),
+                           (chess.KNIGHT, board.knights), (chess.PAWN, board.pawns)):
+        for color in (chess.WHITE, chess.BLACK):
+            for square in chess.scan_forward(bb & board.occupied_co[color]):
+                pieces.append((color, piece_type, square))
+                letters[color] += chess.piece_symbol(piece_type).upper()
+    name, flip = table_name(letters[chess.WHITE], letters[chess.BLACK])
+    return name, flip, pieces
+
+
+# ---------------- probing ----------------
+
+class Bitbase:
+    """
+    The tables in one directory, memory-mapped on first use. probe()
+    returns the value (see the top of this file) of a position for the
+    side to move, or None if no table covers it.
+    """
+
+    def __init__(self, directory=DIRECTORY):
+        self.directory = directory
+        self.tables = {}
+        self.materials = {}
+        self.max_pieces = MAX_PIECES
+        self.probes = 0
+        self.hits = 0
+
+    def __getstate__(self):
+        return {"directory": self.directory}
+
+    def __setstate__(self, state):
+        self.__init__(state["directory"])
+
+    def path(self, name):
+        return os.path.join(self.directory, name + SUFFIX)
+
+    def table(self, name):
+        """The mapped table for `name`, or None if there is no such file."""
+        table = self.tables.get(name, False)
+        if table is False:
+            table = None
+            try:
+                with open(self.path(name), "rb") as f:
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (FileNotFoundError, ValueError):
+                data = None
+            if data is not None:
+                material = Material(name)
+                magic, version, stored = HEADER.unpack_from(data)
+                if (magic != MAGIC or version != FILE_VERSION or stored.rstrip(b"\0").decode() != name
+                        or len(data) != HEADER_BYTES + material.size):
+                    raise ValueError(f"{self.path(name)} is not a bitbase for {name}")
+                table = data
+                self.materials[name] = material
+            self.tables[name] = table
+        return table
+
+    def probe(self, board):
+        if chess.popcount(board.occupied) > MAX_PIECES or board.castling_rights or Zobrist.ep_key(board):
+            return None
+        self.probes += 1
+        name, flip, pieces = board_material(board)
+        if insufficient(name):
+            self.hits += 1
+            return 0
+        table = self.table(name)
+        if table is None:
+            return None
+        material = self.materials[name]
+
+        white_king = board.king(chess.WHITE)
+        black_king = board.king(chess.BLACK)
+        turn = board.turn
+        if flip:
+            white_king, black_king = black_king ^ 56, white_king ^ 56
+            pieces = [(not color, piece_type, square ^ 56) for color, piece_type, square in pieces]
+            turn = not turn
+
+        # fill the piece list in table order
+        squares = [white_king, black_king]
+        for color, piece_type in material.pieces[2:]:
+            for i, (c, p, square) in enumerate(pieces):
+                if c == color and p == piece_type:
+                    squares.append(square)
+                    del pieces[i]
+                    break
+        self.hits += 1
+        value = table[HEADER_BYTES + material.index(turn, squares)]
+        return value - 256 if value > 127 else value
+
+    def close(self):
+        for table in self.tables.values():
+            if table is not None:
+                table.close()
+        self.tables = {}
+
+
+# ---------------- generation ----------------
+
+MATE = 1
+STALEMATE = 2
+NO_EXTERNAL = -32768
+
+_material = None
+_bitbase = None
+
+
+def _init_worker(name, directory):
+    global _material, _bitbase
+    _material = Material(name)
+    _bitbase = Bitbase(directory)
+
+
+def _scan(bounds):
+    """
+    Move generation for indices [lo, hi): per position a status, the
+    indices of its successors in this table, and the best value among
+    moves that leave it (captures and promotions, looked up in the
+    smaller tables).
+    """
+    lo, hi = bounds
+    material = _material
+    bitbase = _bitbase
+    pieces = material.pieces
+    status = array.array("b", bytes(hi - lo))
+    counts = array.array("H", bytes(2 * (hi - lo)))
+    external = array.array("h", [NO_EXTERNAL]) * (hi - lo)
+    children = array.array("I")
+    board = chess.Board(None)
+
+    for offset, index in enumerate(range(lo, hi)):
+        turn, squares = material.decode(index)
+        if len(set(squares)) < len(squares):
+            continue
+        board.clear_board()
+        for (color, piece_type), square in zip(pieces, squares):
+            board.set_piece_at(square, chess.Piece(piece_type, color))
+        board.turn = turn
+        if not board.is_valid():
+            continue
+
+        moves = list(board.legal_moves)
+        if not moves:
+            status[offset] = MATE if board.is_check() else STALEMATE
+            continue
+
+        best = NO_EXTERNAL
+        count = 0
+        for move in moves:
+            if move.promotion or board.piece_type_at(move.to_square):
+                board.push(move)
+                value = bitbase.probe(board)
+                board.pop()
+                if value is None:
+                    raise RuntimeError(f"{material.name} needs the table for {board.fen()} after {move}")
+                value = parent_value(value)
+                if best == NO_EXTERNAL or _better(value, best):
+                    best = value
+            else:
+                child = list(squares)
+                child[squares.index(move.from_square)] = move.to_square
+                children.append(material.index(not turn, child))
+                count += 1
+        counts[offset] = count
+        external[offset] = best
+    return lo, status, counts, children, external
+
+
+def _better(a, b):
+    """Whether value `a` is better than `b` for the side choosing."""
+    return _rank(a) > _rank(b)
+
+
+def _rank(value):
+    if value > 0:
+        return 1000 - value
+    if value < 0:
+        return -1000 - value
+    return 0
+
+
+def _solve(size, status, counts, children, external):
+    """Retrograde passes over the move graph; returns the table as int8 values."""
+    import numpy as np
+
+    status = np.frombuffer(status, dtype=np.int8)
+    counts = np.frombuffer(counts, dtype=np.uint16).astype(np.int64)
+    children = np.frombuffer(children, dtype=np.uint32)
+    external = np.frombuffer(external, dtype=np.int16).astype(np.int64)
+
+    starts = (np.cumsum(counts) - counts)
+    inner = counts > 0
+    inner_starts = starts[inner]
+    has_external = external != NO_EXTERNAL
+    big = 1 << 14
+
+    # external moves: a win in n plies, or a loss/draw that rules out winning by them
+    ext_win = np.where(has_external & (external > 0), external - 1, big)
+    ext_loss = np.where(has_external & (external < 0), -external - 1, 0)
+    ext_allows_loss = ~has_external | (external < 0)
+
+    sign = np.zeros(size, dtype=np.int8)
+    plies = np.zeros(size, dtype=np.int16)
+    known = (status == MATE) | (status == STALEMATE) | (~inner & ~has_external)
+    sign[status == MATE] = -1
+
+    horizon = int(max(ext_win[ext_win < big].max(initial=0), ext_loss.max(initial=0)))
+    p = 0
+    while p <= horizon + 2:
+        p += 1
+        child_sign = sign[children]
+        child_known = known[children]
+        child_plies = plies[children] + 1
+
+        loss = child_known & (child_sign < 0)
+        best_win = ext_win.copy()
+        if len(inner_starts):
+            best_win[inner] = np.minimum(best_win[inner],
+                                         np.minimum.reduceat(np.where(loss, child_plies, big), inner_starts))
+        new_win = ~known & (best_win == p)
+
+        won = child_known & (child_sign > 0)
+        all_won = ext_allows_loss.copy()
+        worst = ext_loss.copy()
+        if len(inner_starts):
+            all_won[inner] &= np.logical_and.reduceat(won, inner_starts)
+            worst[inner] = np.maximum(worst[inner], np.maximum.reduceat(np.where(won, child_plies, 0), inner_starts))
+        new_loss = ~known & all_won & (worst == p)
+
+        sign[new_win] = 1
+        sign[new_loss] = -1
+        plies[new_win | new_loss] = p
+        known |= new_win | new_loss
+        if new_win.any() or new_loss.any():
+            horizon = max(horizon, p)
+
+    values = sign.astype(np.int16) * np.minimum(plies + 1, DTM_LIMIT + 1)
+    return values.astype(np.int8)
+
+
+def generate(name, directory=DIRECTORY, workers=None, chunk=1 << 14, verbose=True):
+    """Builds the table `name` (and any smaller table it needs) into `directory`."""
+    material = Material(name)
+    os.makedirs(directory, exist_ok=True)
+    for dependency in material.dependencies():
+        if not os.path.exists(os.path.join(directory, dependency + SUFFIX)):
+            generate(dependency, directory, workers, chunk, verbose)
+
+    start = time.perf_counter()
+    size = material.size
+    status = array.array("b", bytes(size))
+    counts = array.array("H", bytes(2 * size))
+    external = array.array("h", [NO_EXTERNAL]) * size
+    pieces = [None] * ((size + chunk - 1) // chunk)
+
+    bounds = [(lo, min(size, lo + chunk)) for lo in range(0, size, chunk)]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1:
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(name, directory)) as pool:
+            results = pool.imap_unordered(_scan, bounds)
+            scanned = list(results)
+    else:
+        _init_worker(name, directory)
+        scanned = [_scan(b) for b in bounds]
+
+    for lo, chunk_status, chunk_counts, chunk_children, chunk_external in scanned:
+        hi = lo + len(chunk_status)
+        status[lo:hi] = chunk_status
+        counts[lo:hi] = chunk_counts
+        external[lo:hi] = chunk_external
+        pieces[lo // chunk] = chunk_children
+    children = array.array("I")
+    for chunk_children in pieces:
+        children.extend(chunk_children)
+
+    values = _solve(size, status, counts, children, external)
+    path = os.path.join(directory, name + SUFFIX)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FILE_VERSION, name.encode()).ljust(HEADER_BYTES, b"\0"))
+        f.write(values.tobytes())
+
+    if verbose:
+        wins = int((values > 0).sum())
+        losses = int((values < 0).sum())
+        longest = int(abs(values.astype(int)).max()) - 1
+        print(f"{name}: {size} positions, {wins} wins, {losses} losses, longest mate {longest} plies "
+              f"({time.perf_counter() - start:.1f}s)")
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Endgame bitbases: generate tables or probe a position.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    gen = commands.add_parser("generate", help="build tables, e.g. KQvK KRvK KPvK")
+    gen.add_argument("tables", nargs="+")
+    gen.add_argument("--dir", default=DIRECTORY)
+    gen.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    probe = commands.add_parser("probe", help="look up a FEN")
+    probe.add_argument("fen")
+    probe.add_argument("--dir", default=DIRECTORY)
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        for name in args.tables:
+            generate(name, args.dir, args.workers)
+        return 0
+
+    value = Bitbase(args.dir).probe(chess.Board(args.fen))
+    if value is None:
+        print("not in the bitbases")
+    elif value == 0:
+        print("draw")
+    else:
+        plies = dtm(value)
+        print(f"{'win' if value > 0 else 'loss'}, mate in {plies} plies")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,9 +3,25 @@ import chess
 import chess.polyglot
 import random
 import math
-from concurrent.futures import ThreadPoolExecutor
+import time
+import threading
 import base64
+import hashlib
+import inspect
 from pathlib import Path
+from base.TranspositionTable import TranspositionTable, PersistentTranspositionTable, EXACT, LOWER, UPPER, pack_move, unpack_move
+from base.EvalCache import EvalCache
+from base.PawnStructure import PawnHashTable
+from base.Accumulator import Accumulator
+import base.BatchEval as BatchEval
+import base.Zobrist as Zobrist
+import base.SEE as SEE
+from base.ParallelSearch import ParallelSearch
+from base.Position import Position
+from base.SearchInfo import SearchInfo
+from base.SearchHandle import SearchHandle
+from base.Profiler import Profiler
+from base.Bitbase import Bitbase
 
 PIECE_VALUE = {
     chess.PAWN: 1,
@@ -28,38 +44,306 @@ def mvv_lva_score(board, move):
 
     return PIECE_VALUE[victim.piece_type] * 10 - PIECE_VALUE[attacker.piece_type]
 
+MAX_DEPTH = 64          # depth cap for clock-driven searches
+MOVES_TO_GO = 30        # assumed moves left when splitting the clock
+TIME_CHECK_NODES = 128  # how often (in nodes) the deadline and stop flag are polled
+INFO_INTERVAL = 0.5     # seconds between progress reports to info_callback within an iteration
+PARALLEL_MIN_DEPTH = 3  # shallower iterations aren't worth the process round trip
+ASPIRATION_TRIES = 3    # widenings before falling back to a full window
+MAX_PLY = 128           # killer slots kept per search ply
+HISTORY_MAX = 1_000_000 # history scores are clamped below the killer bonuses
+NULL_MOVE_MIN_DEPTH = 3 # null-move pruning is tried from this depth
+LMR_MIN_DEPTH = 3       # late-move reductions apply from this depth...
+LMR_MIN_MOVES = 3       # ...to quiet moves ordered after this many
+DELTA_MARGIN = 2        # pawns of slack in quiescence delta pruning
+BITBASE_WIN = 1e8       # score of a bitbase win, less the plies to mate from the root
+BITBASE_BAND = 5e7      # scores this far from 0 (short of +-1e9) are bitbase wins and losses
+
+
+def score_to_tt(score, ply):
+    """
+    Bitbase scores count the plies to mate from the search root; the
+    transposition table, which outlives the root, keeps them counted from
+    the node they belong to (`ply` plies below the root).
+    """
+    if BITBASE_BAND <= score < 1e9:
+        return score + ply
+    if -1e9 < score <= -BITBASE_BAND:
+        return score - ply
+    return score
+
+
+def score_from_tt(score, ply):
+    """A score stored with score_to_tt, counted from the current root again."""
+    if BITBASE_BAND <= score < 1e9:
+        return score - ply
+    if -1e9 < score <= -BITBASE_BAND:
+        return score + ply
+    return score
+
+
+class SearchAborted(Exception):
+    """
+    Raised inside the search when the deadline passes or a stop is
+    requested; the iterative deepening driver catches it and falls back to
+    the last finished depth.
+    """
+    pass
+
 class Bot:
+    # set by bots whose evaluation reads self_checks/op_checks
+    counts_checks = False
+    # what one pawn is worth in evaluate()'s units; None turns off the
+    # material-based pruning in quiescence (for evals that aren't material based)
+    pawn_value = None
+    # whether evaluate() looks at the move history (peek, is_repetition...);
+    # if not, the bitboard backend hands it a cheaper board without one
+    eval_uses_history = True
+    # whether evaluate() results can be cached by position; bots whose score
+    # also depends on the path or on state that changes mid-search turn this off.
+    # The cache is keyed by position alone, so it is also off whenever
+    # eval_uses_history is set (repetitions, peek() and the like)
+    cache_evals = True
+    # per-phase piece values and piece-square tables ({piece_type: ...}, see
+    # base/Accumulator.py); when set, the search keeps their totals up to date
+    # move by move and evaluate() reads them with self.accumulated(board)
+    material_values = None
+    pst_tables = None
+    # bump when evaluate() changes in a way the bot's own source doesn't show
+    # (tables loaded from elsewhere...); saved transposition tables written
+    # under another version are not reused (see tt_version)
+    eval_version = 1
+    # polyglot opening books (base.OpeningBook), tried in order by opening()
+    books = ()
 
-    def __init__(self, color=chess.BLACK, depth=2, qsearch=False, qdepth=4):
+    def __init__(self, color=chess.BLACK, depth=2, qsearch=False, qdepth=4, tt_size_mb=16, debug_hash=False, workers=0,
+                 null_move=True, lmr=True, qchecks=False, backend="python-chess", eval_cache_mb=4,
+                 batch_leaves=False, profile=False, tt_path=None, tt_readonly=False, bitbases=None, ponder=False):
         self.color = color
         self.depth = depth
         self.qsearch = qsearch
         self.qdepth = qdepth
+        self.qchecks = qchecks
+        self.null_move = null_move
+        self.lmr = lmr
+        self.backend = backend
+        # score the children of depth-1 nodes together with evaluate_batch()
+        # (only without quiescence, where those children are static leaves)
+        self.batch_leaves = batch_leaves
+        # per-section evaluate() timings (see base/Profiler.py); only
+        # evaluations run in this process are counted, not those of workers
+        self.profiler = Profiler(profile)
         self.IMAGE_DATA = self.to_image_data(self.image())
 
         self.turn = 0
-        self.transposition_table = {}
+        if tt_path is not None:
+            # kept on disk between games and runs (see PersistentTranspositionTable)
+            self.transposition_table = PersistentTranspositionTable(tt_path, tt_size_mb, self.name(),
+                                                                    self.tt_version(), tt_readonly)
+        else:
+            self.transposition_table = TranspositionTable(tt_size_mb)
+        self.eval_cache = None
+        if self.cache_evals and not self.eval_uses_history and eval_cache_mb:
+            self.eval_cache = EvalCache(eval_cache_mb)
+        # directory of endgame bitbases (see base/Bitbase.py) that end the
+        # search at positions with few enough pieces
+        self.bitbase = Bitbase(bitbases) if bitbases is not None else None
+        self.eval_cache_state = None
+        # created on first use by pawn_structure()
+        self.pawn_table = None
+
+        self.accumulator = None
+        if self.material_values or self.pst_tables:
+            self.accumulator = Accumulator(self.material_values, self.pst_tables)
+        # the board main_eval is currently evaluating, whose totals the accumulator holds
+        self.accumulator_board = None
+        # numpy versions of the tables, built on first use by accumulated_batch()
+        self.batch_tables = None
         self.past_moves_hash = {}
         self.has_castled = None
         self.op_has_castled = None
 
         self.op_checks = 0
         self.self_checks = 0
+        self.check_path = []
+
+        self.nodes = 0
+        self.deadline = None
+        # search counters (see search_counters) and the SearchInfo of the
+        # last choose_move(); info_callback, if set, is called with it
+        # after every finished iteration
+        self.qnodes = 0
+        self.tt_cutoffs = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.last_search_info = None
+        self.info_callback = None
+        # set by request_stop() to make the running search give up (see
+        # check_time); worker processes see it through the pool's shared flag
+        self.stop_requested = False
+        self.shared_stop = None
+        # the running iterate() call's SearchInfo and start, and when
+        # info_callback is next due a progress report
+        self.search_info = None
+        self.search_start = None
+        self.next_report = None
+
+        # pondering (see start_pondering): the background search, the reply
+        # it assumes and the key of the position it searches
+        self.ponder = ponder
+        self.ponder_thread = None
+        self.ponder_move = None
+        self.ponder_key = None
+        self.ponder_result = None
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+
+        # zobrist keys of the positions on the current search path
+        self.keys = []
+        self.incremental_hash = True
+        self.debug_hash = debug_hash
+        # whether the current search runs on a base.Position rather than a chess.Board
+        self.bitboard = False
+
+        # root moves are split over a pool of `workers` processes (0 = search in-process)
+        self.workers = workers
+        self.pool = None
+        self.search_id = 0
+        self.game_id = 0
+
+        # quiet move ordering: two killer slots per ply, a butterfly history
+        # table indexed [color * 4096 + from * 64 + to], and the reply that
+        # last refuted each previous move (indexed from * 64 + to)
+        self.root_ply = 0
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [0] * (2 * 4096)
+        self.countermoves = [None] * 4096
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["pool"] = None
+        state["workers"] = 0
+        state["info_callback"] = None
+        state["ponder_thread"] = None
+        state["next_report"] = None
+        state["stop_requested"] = False
+        return state
+
+    def search_state(self):
+        """The bits of game state a worker process needs to mirror this bot."""
+        return {
+            "turn": self.turn,
+            "has_castled": self.has_castled,
+            "op_has_castled": self.op_has_castled,
+            "search_id": self.search_id,
+            "game_id": self.game_id,
+        }
+
+    def tt_version(self):
+        """
+        Identifies what the scores in the transposition table mean: the
+        eval version, a hash of the bot's source, its colour (evaluations
+        aren't symmetric) and the search settings that change leaf scores.
+        """
+        try:
+            source = inspect.getsource(inspect.getmodule(type(self)))
+        except (OSError, TypeError):
+            source = ""
+        settings = f"{self.eval_version}|{self.color}|{self.qsearch and self.qdepth}|{self.qchecks}|"
+        return hashlib.sha1((settings + source).encode()).hexdigest()
+
+    def load_search_state(self, state):
+        if state["game_id"] != self.game_id:
+            self.transposition_table.new_game()
+            if self.eval_cache is not None:
+                self.eval_cache.clear()
+        elif state["search_id"] != self.search_id:
+            self.transposition_table.new_search()
+        if state["search_id"] != self.search_id:
+            # a worker's tables age once per search, like iterate() does here
+            self.age_move_ordering()
+        self.__dict__.update(state)
+
+    def reset_search_counters(self):
+        self.nodes = 0
+        self.qnodes = 0
+        self.tt_cutoffs = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.transposition_table.reset_counters()
+
+    def search_counters(self):
+        """Counters since reset_search_counters(), in base.SearchInfo.COUNTERS order."""
+        tt = self.transposition_table
+        return (self.nodes, self.qnodes, tt.probes, tt.hits, self.tt_cutoffs, self.cutoffs,
+                self.first_move_cutoffs)
+
+    def add_search_counters(self, counters):
+        """Folds in the counters of a search run in a worker process."""
+        nodes, qnodes, probes, hits, tt_cutoffs, cutoffs, first_move_cutoffs = counters
+        self.nodes += nodes
+        self.qnodes += qnodes
+        self.transposition_table.probes += probes
+        self.transposition_table.hits += hits
+        self.tt_cutoffs += tt_cutoffs
+        self.cutoffs += cutoffs
+        self.first_move_cutoffs += first_move_cutoffs
+
+    def principal_variation(self, board, move, max_length=MAX_PLY):
+        """
+        `move` followed by the best-move chain stored in the transposition
+        table. Stops at the first missing or illegal entry, or a repetition.
+        With a worker pool the children of the root are searched in the
+        workers' tables, so the line is just `move`.
+        """
+        board = board.copy()
+        pv = []
+        seen = set()
+        while move is not None and len(pv) < max_length and board.is_legal(move):
+            pv.append(move)
+            board.push(move)
+            key = chess.polyglot.zobrist_hash(board)
+            if key in seen:
+                break
+            seen.add(key)
+            move = unpack_move(self.transposition_table.best_move(key))
+        return pv
+
+    @staticmethod
+    def bitbase_score(value, ply):
+        """Search score of a bitbase value (see base/Bitbase.py) found `ply` plies below the root."""
+        if value == 0:
+            return 0
+        plies = ply + abs(value) - 1
+        return BITBASE_WIN - plies if value > 0 else plies - BITBASE_WIN
+
+    def close(self):
+        """
+        Stops pondering, shuts down the worker pool, if one was started, and
+        flushes a saved transposition table.
+        """
+        self.stop_pondering()
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+        self.transposition_table.flush()
 
     def get_checks(self, board):
-        temp_board = chess.Board()
+        """
+        Sets self_checks/op_checks from the game history by replaying it once.
+        During search they are then kept up to date by make_move/unmake_move.
+        """
+        temp_board = board.root()
         checks = {chess.WHITE: 0, chess.BLACK: 0}
 
         for move in board.move_stack:
             temp_board.push(move)
             if temp_board.is_check():
-                checks[not temp_board.turn and chess.BLACK or chess.WHITE] += 1
-        if self.color == chess.WHITE:
-            self.self_checks = checks[1]
-            self.op_checks = checks[0]
-        else:
-            self.op_checks = checks[1]
-            self.self_checks = checks[0]
+                checks[not temp_board.turn] += 1
+
+        self.self_checks = checks[self.color]
+        self.op_checks = checks[not self.color]
+        self.check_path = []
 
     def image(self):
         return "base/ChessBotBaseIcon.png"
@@ -93,75 +377,801 @@ class Bot:
         raise NotImplementedError
 
     def opening(self, board):
+        """A move to play without searching, or None. By default the first book with a move for `board`."""
+        if not self.books:
+            return None
+        key = Zobrist.board_key(board)
+        for book in self.books:
+            move = book.choose(board, key)
+            if move is not None:
+                return move
         return None
 
-    def all_moves(self, board):
+    def evaluate_batch(self, boards):
+        """
+        evaluate() for a list of boards, returning the scores in order. Used by
+        the batch_leaves search mode; override it to score positions together
+        (see accumulated_batch for stacked material/PST totals).
+        """
+        return [self.evaluate(board) for board in boards]
+
+    def accumulated(self, board):
+        """
+        Material/PST state for `board` (read it with the helpers in
+        base/Accumulator.py). Inside the search this is the incrementally
+        kept state; for any other board it is computed from scratch.
+        """
+        if board is self.accumulator_board:
+            return self.accumulator.state
+        return self.accumulator.compute(board)
+
+    def accumulated_batch(self, boards):
+        """
+        accumulated() for many boards: with numpy the material/PST totals of
+        all of them are computed in one vectorised pass, otherwise one by one.
+        """
+        if not BatchEval.available() or not boards:
+            return [self.accumulator.compute(board) for board in boards]
+        if self.batch_tables is None:
+            self.batch_tables = BatchEval.BatchTables(self.material_values, self.pst_tables)
+        return self.batch_tables.states(boards)
+
+    def profile_report(self):
+        """The evaluation profile collected so far, as a table."""
+        return self.profiler.format(self.true_name())
+
+    def pawn_structure(self, board):
+        """
+        Passed/isolated/doubled/backward pawn bitboards for `board` (see
+        base/PawnStructure.py), cached by pawn key for use in evaluate().
+        """
+        if self.pawn_table is None:
+            self.pawn_table = PawnHashTable()
+        return self.pawn_table.probe(board)
+
+    def all_moves(self, board, ply=None, tt_move=None):
+        """
+        Legal moves, best first. Captures are ordered by MVV-LVA. Inside the
+        search (`ply` given) the TT move goes first, captures that lose
+        material (by SEE) drop behind the other captures, and quiet moves
+        follow by killer slot, countermove, then history score.
+        """
         moves = list(board.legal_moves)
-        moves.sort(
-            key=lambda m: mvv_lva_score(board, m),
-            reverse=True
-        )
+        if ply is None:
+            moves.sort(
+                key=lambda m: mvv_lva_score(board, m),
+                reverse=True
+            )
+            return moves
+
+        killer_1, killer_2 = self.killers[ply] if ply < MAX_PLY else (None, None)
+        counter = None
+        if board.move_stack:
+            previous = board.peek()
+            counter = self.countermoves[previous.from_square * 64 + previous.to_square]
+        history = self.history
+        side = board.turn * 4096
+
+        def order(m):
+            if m == tt_move:
+                return 4 * HISTORY_MAX
+            if board.is_capture(m):
+                if self.losing_capture(board, m):
+                    # behind the other captures but still ahead of quiet
+                    # moves, which searched fewer nodes with the bundled evals
+                    return 3 * HISTORY_MAX - 100 + mvv_lva_score(board, m)
+                return 3 * HISTORY_MAX + mvv_lva_score(board, m)
+            if m == killer_1:
+                return 2 * HISTORY_MAX + 2
+            if m == killer_2:
+                return 2 * HISTORY_MAX + 1
+            if m == counter:
+                return 2 * HISTORY_MAX
+            return history[side + m.from_square * 64 + m.to_square]
+
+        moves.sort(key=order, reverse=True)
         return moves
 
+    def record_cutoff(self, board, move, ply, depth):
+        """Credits a quiet move that caused a beta cutoff."""
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+
+        index = board.turn * 4096 + move.from_square * 64 + move.to_square
+        self.history[index] = min(HISTORY_MAX, self.history[index] + depth * depth)
+
+        if board.move_stack:
+            previous = board.peek()
+            self.countermoves[previous.from_square * 64 + previous.to_square] = move
+
+    def age_move_ordering(self):
+        """Called between searches: killers and countermoves are position
+        specific and start over, history decays."""
+        for killers in self.killers:
+            killers[0] = killers[1] = None
+        self.countermoves = [None] * 4096
+        self.history = [h >> 1 for h in self.history]
+
+    def capture_moves(self, board, checks=False):
+        """
+        Moves worth searching in quiescence: captures (MVV-LVA order) and
+        promotions, plus quiet checks when `checks` is set.
+        """
+        moves = list(board.generate_legal_captures())
+        moves.sort(key=lambda m: mvv_lva_score(board, m), reverse=True)
+
+        back_rank = chess.BB_RANK_8 if board.turn == chess.WHITE else chess.BB_RANK_1
+        pawns = board.pawns & board.occupied_co[board.turn]
+        moves += board.generate_legal_moves(pawns, back_rank & ~board.occupied)
+
+        if checks:
+            for move in board.generate_legal_moves(chess.BB_ALL, ~board.occupied):
+                if not move.promotion and not board.is_capture(move) and board.gives_check(move):
+                    moves.append(move)
+        return moves
+
+    def losing_capture(self, board, move):
+        """Whether a capture loses material once the exchange plays out."""
+        victim = board.piece_type_at(move.to_square) or chess.PAWN
+        attacker = board.piece_type_at(move.from_square)
+        # taking something at least as valuable can't lose
+        if PIECE_VALUE[attacker] <= PIECE_VALUE[victim]:
+            return False
+        return SEE.see(board, move) < 0
+
     def quiescence(self, board, depth, alpha, beta):
-        stand_pat = self.main_eval(board)  # now correctly perspective-relative
-        
-        if stand_pat >= beta:
-            return beta
-        alpha = max(alpha, stand_pat)
+        self.nodes += 1
+        self.qnodes += 1
+        if self.nodes % TIME_CHECK_NODES == 0:
+            self.check_time()
 
-        if depth == 0 or board.is_game_over():
-            return alpha
+        h = self.keys[-1]
+        ply = len(board.move_stack) - self.root_ply
+        entry = self.transposition_table.probe(h)
+        if entry is not None:
+            cached_score, _, bound, _ = entry
+            cached_score = score_from_tt(cached_score, ply)
+            if (bound == EXACT or (bound == LOWER and cached_score >= beta)
+                    or (bound == UPPER and cached_score <= alpha)):
+                self.tt_cutoffs += 1
+                return cached_score
 
-        for move in self.all_moves(board):
-            if not board.is_capture(move) and not board.gives_check(move):
-                continue
-            board.push(move)
+        alpha_orig = alpha
+        in_check = depth > 0 and board.is_check()
+
+        if in_check:
+            # no standing pat in check: every evasion is searched
+            moves = self.all_moves(board)
+            if not moves:
+                return self.main_eval(board)
+            stand_pat = None
+        else:
+            stand_pat = self.main_eval(board)  # now correctly perspective-relative
+
+            if stand_pat >= beta:
+                return beta
+            alpha = max(alpha, stand_pat)
+
+            if depth == 0:
+                return alpha
+            moves = self.capture_moves(board, self.qchecks and depth == self.qdepth)
+
+        material_pruning = stand_pat is not None and self.pawn_value is not None
+        best_move = None
+        for move in moves:
+            if material_pruning and not move.promotion and board.is_capture(move):
+                # delta pruning: even winning the victim for free can't reach alpha
+                victim = board.piece_type_at(move.to_square) or chess.PAWN
+                if stand_pat + (PIECE_VALUE[victim] + DELTA_MARGIN) * self.pawn_value <= alpha:
+                    continue
+                if self.losing_capture(board, move):
+                    continue
+
+            self.make_move(board, move)
             score = -self.quiescence(board, depth - 1, -beta, -alpha)
-            board.pop()
+            self.unmake_move(board)
             if score >= beta:
+                self.transposition_table.store(h, 0, LOWER, score_to_tt(beta, ply), pack_move(move))
                 return beta
-            alpha = max(alpha, score)
+            if score > alpha:
+                alpha = score
+                best_move = move
 
+        bound = UPPER if alpha <= alpha_orig else EXACT
+        self.transposition_table.store(h, 0, bound, score_to_tt(alpha, ply), pack_move(best_move))
         return alpha
 
+    def search_board(self, board):
+        """
+        The board the search runs on: a bitboard Position copy when the
+        "bitboard" backend is selected (standard chess only), else `board`.
+        """
+        if self.backend == "bitboard" and Zobrist.is_clean(board):
+            return Position.from_board(board)
+        return board
+
+    def eval_state(self):
+        """
+        Game state (beyond the position) that evaluate() reads. Cached
+        evaluations are dropped whenever it changes between searches.
+        """
+        return self.color, self.has_castled, self.op_has_castled
+
+    def begin_search(self, board):
+        """Sets up the per-search state for the root position."""
+        if self.eval_cache is not None and self.eval_state() != self.eval_cache_state:
+            self.eval_cache.clear()
+            self.eval_cache_state = self.eval_state()
+        self.bitboard = isinstance(board, Position)
+        if self.bitboard:
+            self.keys = [board.key]
+        else:
+            self.keys = [chess.polyglot.zobrist_hash(board)]
+            self.incremental_hash = Zobrist.is_clean(board)
+        self.root_ply = len(board.move_stack)
+        if self.accumulator is not None:
+            self.accumulator.reset(board)
+        if self.counts_checks:
+            self.get_checks(board.view() if self.bitboard else board)
+
+    def make_move(self, board, move):
+        """
+        Pushes a move during search and updates the incremental state
+        (zobrist key, material/PST totals, check counts) alongside it. Pair every call with
+        unmake_move.
+        """
+        if self.accumulator is not None:
+            self.accumulator.push(board, move)
+
+        if self.bitboard:
+            # Position keeps its own key up to date
+            board.push(move)
+            self.keys.append(board.key)
+            if self.debug_hash:
+                expected = chess.polyglot.zobrist_hash(board.view())
+                if board.key != expected:
+                    raise AssertionError(f"Position key {board.key:#x} != {expected:#x} after {move} ({board.fen()})")
+        elif not self.incremental_hash:
+            board.push(move)
+            self.keys.append(chess.polyglot.zobrist_hash(board))
+        else:
+            key = self.keys[-1] ^ Zobrist.piece_delta(board, move) ^ Zobrist.ep_key(board) ^ Zobrist.TURN_KEY
+            rights = board.castling_rights
+            board.push(move)
+            if board.castling_rights != rights:
+                key ^= Zobrist.castling_key(rights) ^ Zobrist.castling_key(board.castling_rights)
+            if board.ep_square is not None:
+                key ^= Zobrist.ep_key(board)
+            self.keys.append(key)
+
+            if self.debug_hash:
+                expected = chess.polyglot.zobrist_hash(board)
+                if key != expected:
+                    raise AssertionError(f"Incremental zobrist key {key:#x} != {expected:#x} after {move} ({board.fen()})")
+
+        if self.debug_hash and self.accumulator is not None:
+            if self.accumulator.state != self.accumulator.compute(board):
+                raise AssertionError(f"Incremental material/PST totals are off after {move} ({board.fen()})")
+
+        if self.counts_checks:
+            gave_check = board.is_check()
+            self.check_path.append(gave_check)
+            if gave_check:
+                if board.turn != self.color:
+                    self.self_checks += 1
+                else:
+                    self.op_checks += 1
+
+    def make_null_move(self, board):
+        """Passes the turn (for null-move pruning). Undo with unmake_move."""
+        key = self.keys[-1] ^ Zobrist.ep_key(board) ^ Zobrist.TURN_KEY
+        board.push(chess.Move.null())
+        if self.accumulator is not None:
+            self.accumulator.push_null()
+        if self.bitboard:
+            key = board.key
+        elif not self.incremental_hash:
+            key = chess.polyglot.zobrist_hash(board)
+        self.keys.append(key)
+        if self.counts_checks:
+            self.check_path.append(False)
+
+    def unmake_move(self, board):
+        board.pop()
+        self.keys.pop()
+        if self.accumulator is not None:
+            self.accumulator.pop()
+
+        if self.counts_checks and self.check_path.pop():
+            if board.turn == self.color:
+                self.self_checks -= 1
+            else:
+                self.op_checks -= 1
+
+    def unwind(self, board, ply):
+        """Takes back search moves until the board is `ply` half-moves long."""
+        while len(board.move_stack) > ply:
+            self.unmake_move(board)
+
     def main_eval(self, board):
-        self.get_checks(board)
-        score = self.evaluate(board)
+        cache = self.eval_cache
+        score = None if cache is None else cache.probe(self.keys[-1])
+        if score is None:
+            # evaluate() always sees a chess.Board
+            eval_board = board.view(self.eval_uses_history) if self.bitboard else board
+            self.accumulator_board = eval_board
+            try:
+                score = self.evaluate(eval_board)
+            finally:
+                self.accumulator_board = None
+            if cache is not None:
+                cache.store(self.keys[-1], score)
         return score if board.turn == self.color else -score
 
+    def check_time(self):
+        if self.stop_requested or (self.shared_stop is not None and self.shared_stop.value):
+            raise SearchAborted
+        if self.deadline is None and self.next_report is None:
+            return
+        now = time.monotonic()
+        if self.deadline is not None and now >= self.deadline:
+            raise SearchAborted
+        if self.next_report is not None and now >= self.next_report:
+            self.next_report = now + INFO_INTERVAL
+            info = self.search_info
+            info.set_counters(self.search_counters())
+            info.time = now - self.search_start
+            self.info_callback(info)
+
+    def request_stop(self):
+        """Makes the running search (in this process and the workers) return as soon as it notices."""
+        self.stop_requested = True
+        if self.pool is not None:
+            self.pool.stop.value = 1
+
+    def clear_stop(self):
+        self.stop_requested = False
+        if self.pool is not None:
+            self.pool.stop.value = 0
+
+    def time_budget(self, remaining_time, increment=0):
+        """
+        Splits the clock into a per-move budget. Returns (soft, hard) in
+        seconds: no new iteration is started past the soft limit, and the
+        running one is abandoned at the hard limit.
+        """
+        target = remaining_time / MOVES_TO_GO + (increment or 0) * 0.75
+        hard = min(target * 2, remaining_time * 0.5)
+        soft = min(target * 0.5, hard)
+        return soft, hard
+
     def minimax(self, board, depth, alpha, beta):
-        h = chess.polyglot.zobrist_hash(board)
+        self.nodes += 1
+        if self.nodes % TIME_CHECK_NODES == 0:
+            self.check_time()
+
+        h = self.keys[-1]
+        ply = len(board.move_stack) - self.root_ply
 
-        # Only use cached result if it was searched at least as deep
-        if h in self.transposition_table:
-            cached_score, cached_depth = self.transposition_table[h]
-            if cached_depth >= depth:
+        # Only use cached result if it was searched at least as deep, and
+        # only as far as its bound allows
+        entry = self.transposition_table.probe(h)
+        tt_move = None
+        if entry is not None:
+            cached_score, cached_depth, bound, packed_move = entry
+            cached_score = score_from_tt(cached_score, ply)
+            tt_move = unpack_move(packed_move)
+            if cached_depth >= depth and (bound == EXACT or (bound == LOWER and cached_score >= beta)
+                                          or (bound == UPPER and cached_score <= alpha)):
+                self.tt_cutoffs += 1
                 return cached_score
 
+        if self.bitbase is not None and chess.popcount(board.occupied) <= self.bitbase.max_pieces:
+            result = self.bitbase.probe(board)
+            if result is not None:
+                return self.bitbase_score(result, ply)
+
         if depth == 0 or board.is_game_over():
             if self.qsearch:
                 return self.quiescence(board, self.qdepth, alpha, beta)
             return self.main_eval(board)
 
+        if depth == 1 and self.batch_leaves and not self.qsearch:
+            return self.search_frontier(board, alpha, beta)
+
+        in_check = board.is_check()
+
+        # null-move pruning: if passing still fails high, a real move will too.
+        # Not in check, not twice in a row, and not with only pawns left,
+        # where zugzwang makes passing an advantage it never is in a game
+        if (self.null_move and depth >= NULL_MOVE_MIN_DEPTH and not in_check and beta < 1e9
+                and board.move_stack and board.peek()
+                and board.occupied_co[board.turn] & ~(board.pawns | board.kings)):
+            reduction = 3 if depth > 6 else 2
+            self.make_null_move(board)
+            score = -self.minimax(board, depth - 1 - reduction, -beta, -math.nextafter(beta, -math.inf))
+            self.unmake_move(board)
+            if score >= beta:
+                return beta
+
+        alpha_orig = alpha
         value = -1e9
-        for move in self.all_moves(board):
-            board.push(move)
-            value = max(value, -self.minimax(board, depth - 1, -beta, -alpha))
-            board.pop()
+        best_move = None
+        for i, move in enumerate(self.all_moves(board, ply, tt_move)):
+            quiet = not move.promotion and not board.is_capture(move)
+            self.make_move(board, move)
+            if i == 0:
+                score = -self.minimax(board, depth - 1, -beta, -alpha)
+            else:
+                # late-move reductions: quiet moves ordered late are searched
+                # shallower first and only get the full depth if they beat alpha
+                reduction = 0
+                if (self.lmr and quiet and i >= LMR_MIN_MOVES and depth >= LMR_MIN_DEPTH
+                        and not in_check and not board.is_check()):
+                    reduction = min(1 if i < 2 * LMR_MIN_MOVES else 2, depth - 2)
+
+                # principal variation search: prove the move is no better
+                # with a null window, re-search only if that fails high
+                null_beta = -math.nextafter(alpha, math.inf)
+                score = -self.minimax(board, depth - 1 - reduction, null_beta, -alpha)
+                if reduction and score > alpha:
+                    score = -self.minimax(board, depth - 1, null_beta, -alpha)
+                if alpha < score < beta:
+                    score = -self.minimax(board, depth - 1, -beta, -alpha)
+            self.unmake_move(board)
+            if score > value:
+                value = score
+                best_move = move
             alpha = max(alpha, value)
             if alpha >= beta:
+                self.cutoffs += 1
+                if i == 0:
+                    self.first_move_cutoffs += 1
+                if quiet:
+                    self.record_cutoff(board, move, ply, depth)
                 break
 
-        # Cache with depth so shallow results don't override deep ones
-        self.transposition_table[h] = (value, depth)
+        if value <= alpha_orig:
+            bound = UPPER
+        elif value >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.transposition_table.store(h, depth, bound, score_to_tt(value, ply), pack_move(best_move))
         return value
 
-    def choose_move(self, board: chess.Board, depth=None, remaining_time=None):
+    def search_frontier(self, board, alpha, beta):
+        """
+        A depth-1 node in batch_leaves mode. Every child is a static leaf, so
+        instead of evaluating them one at a time (with cutoffs) they are all
+        collected, scored in a single evaluate_batch() call, and maxed over.
+        """
+        h = self.keys[-1]
+        cache = self.eval_cache
+        history = self.eval_uses_history
+        moves = list(board.legal_moves)
+        scores = [None] * len(moves)
+        # evaluate() scores for self.color; the parent wants them from the side to move here
+        sign = 1 if board.turn == self.color else -1
+        leaves = []
+        pending = []
+
+        for i, move in enumerate(moves):
+            self.nodes += 1
+            if self.nodes % TIME_CHECK_NODES == 0:
+                self.check_time()
+            self.make_move(board, move)
+            key = self.keys[-1]
+            score = None if cache is None else cache.probe(key)
+            if score is None:
+                leaf = board.view(history) if self.bitboard else board
+                leaves.append(leaf.copy(stack=history))
+                pending.append((i, key))
+            else:
+                scores[i] = sign * score
+            self.unmake_move(board)
+
+        for (i, key), score in zip(pending, self.evaluate_batch(leaves)):
+            if cache is not None:
+                cache.store(key, score)
+            scores[i] = sign * score
+
+        value = -1e9
+        best_move = None
+        for move, score in zip(moves, scores):
+            if score > value:
+                value = score
+                best_move = move
+
+        if value <= alpha:
+            bound = UPPER
+        elif value >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.transposition_table.store(h, 1, bound, value, pack_move(best_move))
+        return value
+
+    def search_root(self, board, moves, depth, alpha=-1e9, beta=1e9):
+        """
+        Scores the root moves with principal variation search inside the
+        (alpha, beta) window. Returns (score, move, exact) triples: moves that
+        failed low only carry an upper bound, and the list stops at the first
+        move that fails high.
+        """
+        if self.workers > 1 and depth >= PARALLEL_MIN_DEPTH and len(moves) > 1:
+            if self.pool is None:
+                self.pool = ParallelSearch(self, self.workers)
+                self.pool.stop.value = int(self.stop_requested)
+            # workers get a plain chess.Board and pick their own backend
+            root = board.view() if self.bitboard else board
+            scored_moves, counters = self.pool.search_root(root, moves, depth, self.search_state(),
+                                                           self.deadline, alpha, beta)
+            self.add_search_counters(counters)
+            if scored_moves is None:
+                raise SearchAborted
+            return scored_moves
+
+        scored_moves = []
+        for i, move in enumerate(moves):
+            self.make_move(board, move)
+            if i == 0:
+                score = -self.minimax(board, depth - 1, -beta, -alpha)
+            else:
+                score = -self.minimax(board, depth - 1, -math.nextafter(alpha, math.inf), -alpha)
+                if alpha < score < beta:
+                    score = -self.minimax(board, depth - 1, -beta, -alpha)
+            self.unmake_move(board)
+            scored_moves.append((score, move, alpha < score < beta))
+            if score >= beta:
+                break
+            alpha = max(alpha, score)
+        return scored_moves
+
+    def aspiration_delta(self, score):
+        """Half-width of the first aspiration window around `score`."""
+        return max(self.max_eval() / 20, abs(score) * 0.05)
+
+    def aspiration_search(self, board, moves, depth, guess):
+        """
+        Searches the root in a narrow window around the previous iteration's
+        score, widening on a fail low/high until the result lands inside.
+        """
+        if guess is None or not -1e9 < guess < 1e9:
+            return self.search_root(board, moves, depth)
+
+        delta = self.aspiration_delta(guess)
+        alpha, beta = guess - delta, guess + delta
+        for tries in range(ASPIRATION_TRIES):
+            scored_moves = self.search_root(board, moves, depth, alpha, beta)
+            best = max(s for s, m, exact in scored_moves)
+            delta *= 4
+            if best <= alpha and alpha > -1e9:
+                alpha = max(-1e9, guess - delta)
+            elif best >= beta and beta < 1e9:
+                beta = min(1e9, guess + delta)
+            else:
+                return scored_moves
+        # still outside after the widenings (possibly on the other side by
+        # now): the full window always lands the result
+        return self.search_root(board, moves, depth)
+
+    def iterate(self, board, depth, soft=None, hard=None, info=None, resume=None, report=False, multipv=1):
+        """
+        Iterative deepening from depth 1 (or on from `resume`, a finished
+        (scored moves, depth) to continue) up to `depth`, within the
+        soft/hard time limits. Returns the root moves as (score, move, exact)
+        triples, best first, from the last finished iteration; `info` gets
+        the statistics, and with `report` info_callback is called after
+        every iteration. With `multipv` > 1 every iteration is a
+        multipv_search() and info.lines gets the lines found.
+        """
+        if info is None:
+            info = SearchInfo()
+        self.reset_search_counters()
+        self.search_id += 1
+        self.transposition_table.new_search()
+        self.age_move_ordering()
+        search_board = self.search_board(board)
+        self.begin_search(search_board)
+        start = time.monotonic()
+        root_ply = len(search_board.move_stack)
+        moves = self.all_moves(search_board)
+        scored_moves = []
+        guess = None
+        first_depth = 1
+        self.search_info = info
+        self.search_start = start
+        if report and self.info_callback is not None:
+            self.next_report = start + INFO_INTERVAL
+        if resume is not None:
+            scored_moves, searched_depth = resume
+            moves = [m for s, m, exact in scored_moves]
+            guess = scored_moves[0][0]
+            first_depth = searched_depth + 1
+            info.depth = searched_depth
+            info.score = guess
+            info.move = moves[0]
+            info.pv = self.principal_variation(board, moves[0], searched_depth)
+
+        for current_depth in range(first_depth, max(1, depth) + 1):
+            # the first iteration always finishes so there is a move to fall back on
+            self.deadline = start + hard if hard is not None and scored_moves else None
+            iteration_start = time.monotonic()
+            iteration_nodes = self.nodes
+            try:
+                if multipv > 1:
+                    iteration = self.multipv_search(search_board, moves, current_depth, multipv, scored_moves)
+                else:
+                    iteration = self.aspiration_search(search_board, moves, current_depth, guess)
+            except SearchAborted:
+                self.unwind(search_board, root_ply)
+                break
+            finally:
+                self.deadline = None
+
+            # order the next iteration by this one's scores (stable for ties);
+            # a list cut short by a mating move keeps the unsearched moves last
+            iteration.sort(key=lambda x: x[0], reverse=True)
+            scored_moves = iteration
+            searched = {m for s, m, exact in iteration}
+            moves = [m for s, m, exact in iteration] + [m for m in moves if m not in searched]
+            guess = iteration[0][0]
+
+            now = time.monotonic()
+            info.set_counters(self.search_counters())
+            info.time = now - start
+            info.add_iteration(current_depth, self.nodes - iteration_nodes, now - iteration_start, guess,
+                               self.principal_variation(board, moves[0], current_depth))
+            if report and self.info_callback is not None:
+                self.info_callback(info)
+
+            if soft is not None and time.monotonic() - start >= soft:
+                break
+
+        self.next_report = None
+        info.set_counters(self.search_counters())
+        info.time = time.monotonic() - start
+        if multipv > 1:
+            info.lines = [(score, self.principal_variation(board, move, info.depth))
+                          for score, move, exact in scored_moves if exact]
+        return scored_moves
+
+    def multipv_search(self, board, moves, depth, multipv, previous=()):
+        """
+        The best `multipv` root moves with exact scores, best first. Each
+        line is one aspiration search (re-searched with an unbounded window
+        if it only yields a bound) over the moves not found yet (around
+        that line's score in `previous`, the last iteration), so it only has
+        to find the best of what is left rather than re-search the moves
+        ahead of it. The rest of `moves` follow as (-inf, move, False).
+        """
+        remaining = list(moves)
+        lines = []
+        while remaining and len(lines) < multipv:
+            k = len(lines)
+            guess = previous[k][0] if k < len(previous) and previous[k][2] else None
+            score, move, exact = max(self.aspiration_search(board, remaining, depth, guess), key=lambda x: x[0])
+            if not exact:
+                # only a bound (a mate score at the window's edge): settle the
+                # line with an unbounded window, where the best score is exact
+                score, move, exact = max(self.search_root(board, remaining, depth, -math.inf, math.inf),
+                                         key=lambda x: x[0])
+            lines.append((score, move, True))
+            remaining.remove(move)
+        return lines + [(-math.inf, move, False) for move in remaining]
+
+    def analyse(self, board, multipv=3, depth=None, time_limit=None):
+        """
+        Multi-PV analysis of `board`: the best `multipv` moves with exact
+        scores and principal variations, as [(score, pv)] best first (also
+        left in last_search_info.lines). Searches up to `depth` (default
+        self.depth), or with `time_limit` (seconds) as deep as it can in
+        that time, reporting the last finished depth. No book, and the
+        game state (turn, move history) is left alone.
+        """
+        self.stop_pondering()
+        info = SearchInfo()
+        self.last_search_info = info
+        if depth is None:
+            depth = MAX_DEPTH if time_limit is not None else self.depth
+        self.iterate(board, depth, time_limit, time_limit, info, report=True, multipv=max(1, multipv))
+        if multipv <= 1 and info.move is not None:
+            info.lines = [(info.score, info.pv)]
+        return info.lines
+
+    def start_pondering(self, board, depth=None):
+        """
+        Thinks on the opponent's time. `board` is the game right after this
+        bot's move; the reply the last search expected (the second move of
+        its PV) is played on a copy and searched in a background thread, up
+        to `depth` (default self.depth), filling the transposition table.
+        Returns the expected reply, or None if there is nothing to ponder
+        or the bot was made without ponder=True.
+        """
+        self.stop_pondering()
+        info = self.last_search_info
+        if not self.ponder or info is None or len(info.pv) < 2:
+            return None
+        if not board.move_stack or board.peek() != info.pv[0] or not board.is_legal(info.pv[1]):
+            return None
+        ponder_board = board.copy()
+        ponder_board.push(info.pv[1])
+        if ponder_board.is_game_over():
+            return None
+
+        self.ponder_move = info.pv[1]
+        self.ponder_key = chess.polyglot.zobrist_hash(ponder_board)
+        self.ponder_result = None
+        self.ponder_thread = threading.Thread(target=self._ponder, args=(ponder_board, depth or self.depth),
+                                              daemon=True)
+        self.ponder_thread.start()
+        return self.ponder_move
+
+    def _ponder(self, board, depth):
+        info = SearchInfo()
+        scored_moves = self.iterate(board, depth, info=info)
+        if scored_moves:
+            self.ponder_result = (scored_moves, info.depth)
+
+    def stop_pondering(self, board=None):
+        """
+        Stops a running ponder search, which notices within a few hundred
+        nodes. Given the position now on the board, returns the ponder
+        search's (scored moves, depth) if that is the position it searched
+        (a ponder hit), else None.
+        """
+        if self.ponder_thread is None:
+            return None
+        # a stop meant for the caller's own search has to outlast this one
+        stopped = self.stop_requested
+        self.request_stop()
+        self.ponder_thread.join()
+        self.ponder_thread = None
+        if not stopped:
+            self.clear_stop()
+        result, self.ponder_result = self.ponder_result, None
+        if board is None or result is None or chess.polyglot.zobrist_hash(board) != self.ponder_key:
+            self.ponder_misses += board is not None
+            return None
+        self.ponder_hits += 1
+        return result
+
+    def start_search(self, board, limits=None, info_callback=None, on_done=None):
+        """
+        Runs choose_move(board, **limits) in a background thread and returns
+        its base.SearchHandle, which can stop() it and wait for the result().
+        info_callback gets the SearchInfo after every finished depth and,
+        while the search runs in this process rather than in workers,
+        every INFO_INTERVAL seconds in between; on_done gets the handle once
+        the search has returned, on the search thread (a Tk GUI should poll
+        handle.running from its main loop instead). One search per bot at a
+        time.
+        """
+        return SearchHandle(self, board, limits, info_callback, on_done).start()
+
+    def choose_move(self, board: chess.Board, depth=None, remaining_time=None, increment=0):
+        """
+        Iterative deepening driver. Without a clock it searches depth 1 up to
+        `depth` (default self.depth); with `remaining_time`/`increment` (in
+        seconds) it keeps deepening until the per-move budget runs out and
+        plays the best move of the last finished iteration.
+        Statistics for the call are left in self.last_search_info.
+        A ponder search (see start_pondering) is stopped first; if it was
+        searching this position its iterations are not repeated.
+        """
+        pondered = self.stop_pondering(board)
         last_board = board.copy()
+        info = SearchInfo()
+        self.last_search_info = info
         move = self.opening(board)
         if move is not None and move in board.legal_moves:
             self.turn += 1
+            info.move = move
+            info.pv = [move]
             return move
 
         self.turn += 1
@@ -174,46 +1184,40 @@ class Bot:
             board.push(move)
             if board.is_checkmate():
                 board.pop()
+                info.move = move
+                info.pv = [move]
                 return move
             board.pop()
 
         if depth is None:
-            depth = self.depth
+            depth = MAX_DEPTH if remaining_time is not None else self.depth
 
+        soft = hard = None
         if remaining_time is not None:
-            if remaining_time < 50:
-                depth = max(1, depth - 3)
-            elif remaining_time < 300:
-                depth = max(1, depth - 2)
-            elif remaining_time < 500:
-                depth = max(1, depth - 1)
-
-        moves = self.all_moves(board)
-
-        if depth > 1:
-            def eval_move(move):
-                board_copy = board.copy()
-                board_copy.push(move)
-                score = -self.minimax(board_copy, depth - 1, -1e9, 1e9)
-                return score, move
-
-            with ThreadPoolExecutor() as executor:
-                scored_moves = list(executor.map(eval_move, moves))
-        else:
-            scored_moves = []
-            for move in moves:
-                board.push(move)
-                score = -self.minimax(board, depth - 1, -1e9, 1e9)
-                board.pop()
-                scored_moves.append((score, move))
+            soft, hard = self.time_budget(remaining_time, increment)
 
+        scored_moves = self.iterate(board, depth, soft, hard, info, resume=pondered, report=True)
         if not scored_moves:
-            return None
+            # stopped before depth 1 finished: the move an earlier search
+            # stored for this position, else the first in root order
+            moves = self.all_moves(board)
+            if not moves:
+                return None
+            tt_move = unpack_move(self.transposition_table.best_move(h))
+            best_move = tt_move if tt_move in moves else moves[0]
+            info.move = best_move
+            info.pv = [best_move]
+            self.past_moves_hash[h] = best_move
+            self.move_chosen(best_move)
+            return best_move
 
-        scored_moves.sort(key=lambda x: x[0], reverse=True)
         best_score = scored_moves[0][0]
-        best_moves = [m for s, m in scored_moves if abs(s - best_score) < 1e-6]
+        best_moves = [m for s, m, exact in scored_moves if exact and abs(s - best_score) < 1e-6]
         best_move = random.choice(best_moves) if best_moves else scored_moves[0][1]
+        if best_move != info.move:
+            # a different move among equally scored ones
+            info.move = best_move
+            info.pv = self.principal_variation(board, best_move, info.depth)
 
         self.past_moves_hash[h] = best_move
         self.move_chosen(best_move)
@@ -224,6 +1228,9 @@ class Bot:
 
     def update_castling_status(self, move, board):
         if board.is_castling(move):
+            # a ponder search evaluates with has_castled/op_has_castled; it
+            # must not see them change (nor keep results from before)
+            self.stop_pondering()
             moving_color = board.color_at(move.from_square)
             if moving_color == self.color:
                 if board.is_kingside_castling(move):
@@ -238,7 +1245,11 @@ class Bot:
     
 
     def reset(self):
-        self.transposition_table.clear()
+        self.stop_pondering()
+        self.game_id += 1
+        self.transposition_table.new_game()
+        if self.eval_cache is not None:
+            self.eval_cache.clear()
         self.past_moves_hash.clear()
         self.turn = 0
         self.has_castled = None
@@ -25,6 +25,7 @@ COORD_DARK = "#f0d9b5"
 
 BOARD_SIZE = 8 * SQUARE_SIZE
 COORD_PAD = 20  # space for rank/file labels
+SEARCH_POLL_MS = 50  # how often the main loop checks whether a bot search has finished
 
 class PromotionDialog(tk.Toplevel):
     def __init__(self, parent, color):
@@ -81,6 +82,8 @@ class chessGUI:
 
         self.white_eval_bot = None
         self.black_eval_bot = None
+        # the running bot search (base.SearchHandle), if any
+        self.search = None
 
         self.root = tk.Tk()
         self.root.title("Chess Handler")
@@ -195,6 +198,7 @@ class chessGUI:
         self.copy_pgn_btn.pack(side=tk.LEFT, padx=4)
 
         self.canvas.bind("<Button-1>", self.on_click)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
         self.draw()
         self.root.after(self.move_time, self.bot_turn)
     
@@ -535,13 +539,20 @@ class chessGUI:
         if current_player == 'human' or current_player is None:
             return
 
-        board_copy = self.board.copy()
+        # Tk may only be touched from the main loop, so it polls the search
+        # instead of the search thread calling back into the GUI
+        self.search = current_player.start_search(self.board)
+        self.root.after(SEARCH_POLL_MS, self._poll_search)
 
-        def compute_move():
-            move = current_player.choose_move(board_copy)
-            self.root.after(0, lambda: self._apply_bot_move(move))
-
-        threading.Thread(target=compute_move, daemon=True).start()
+    def _poll_search(self):
+        search = self.search
+        if search is None or search.stopped:
+            return
+        if search.running:
+            self.root.after(SEARCH_POLL_MS, self._poll_search)
+            return
+        self.search = None
+        self._apply_bot_move(search.result())
 
     def _apply_bot_move(self, move):
         if move is not None:
@@ -558,6 +569,11 @@ class chessGUI:
             self.draw()
             self.update_status()
 
+            # the bot that just moved thinks about its next move on the opponent's time
+            mover = self.black_player if self.board.turn == chess.WHITE else self.white_player
+            if hasattr(mover, 'start_pondering') and not self.board.is_game_over():
+                mover.start_pondering(self.board)
+
         next_player = self.white_player if self.board.turn == chess.WHITE else self.black_player
         if next_player != 'human' and not self.board.is_game_over():
             self.root.after(self.move_time, self.bot_turn)
@@ -573,6 +589,16 @@ class chessGUI:
                 if hasattr(player, 'update_castling_status'):
                     player.update_castling_status(move, board_before)
 
+    def close(self):
+        """Stops the bots' searches (and pondering) before the window goes away."""
+        if self.search is not None:
+            self.search.stop()
+            self.search.wait(1.0)
+        for player in (self.white_player, self.black_player):
+            if hasattr(player, 'close'):
+                player.close()
+        self.root.destroy()
+
     def get_psdat_line(self, line):
         with open(f"pieces/{self.piece_set}/{self.piece_set}.psdat", "r") as file:
             return file.readlines()[line]
@@ -0,0 +1,60 @@
+import array
+
+# key (Q) + score (d)
+ENTRY_BYTES = 8 + 8
+
+
+class EvalCache:
+    """
+    Fixed-size cache of evaluate() results keyed by zobrist key (polyglot
+    keys already include the side to move).
+
+    The table is direct mapped: each key has exactly one slot, and a new
+    score always evicts whatever was there.
+    """
+
+    def __init__(self, size_mb=4):
+        self.size_mb = size_mb
+
+        entries = max(1, int(size_mb * 1024 * 1024) // ENTRY_BYTES)
+        self.size = 1 << (entries.bit_length() - 1)
+        self.mask = self.size - 1
+        self.clear()
+
+    def clear(self):
+        n = self.size
+        self.keys = array.array("Q", bytes(8 * n))
+        self.scores = array.array("d", bytes(8 * n))
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def probe(self, key):
+        """Cached score for this position, or None."""
+        self.probes += 1
+        i = key & self.mask
+        if self.keys[i] != key:
+            return None
+        self.hits += 1
+        return self.scores[i]
+
+    def store(self, key, score):
+        self.stores += 1
+        i = key & self.mask
+        if self.keys[i] and self.keys[i] != key:
+            self.evictions += 1
+        self.keys[i] = key
+        self.scores[i] = score
+
+    def stats(self):
+        return {
+            "probes": self.probes,
+            "hits": self.hits,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+        }
@@ -0,0 +1,141 @@
+import random
+import struct
+import sys
+
+import chess
+import chess.polyglot
+
+# Polyglot opening books. A .bin book is a sorted array of 16-byte entries
+# (zobrist key, move, weight, learn); python-chess maps the file into memory
+# and finds a position's entries with a binary search on the key, so a book
+# probe costs a few microseconds and nothing is loaded up front.
+#
+# Bots attach books declaratively:
+#
+#     class Bot(ChessBotBase.Bot):
+#         books = [OpeningBook("books/alephNull.bin", selection="weighted", max_moves=15)]
+#
+# and Bot.opening() plays from them until they run out or max_moves is
+# passed. Books are built from plain-text repertoires with
+#
+#     python -m base.OpeningBook books/alephNull.txt books/alephNull.bin
+#
+# where every line is one variation in UCI from the start position, headed
+# by the side it is a repertoire for and optionally a weight:
+#
+#     white: e2e4 e7e5 g1f3 b8c6 f1b5 a7a6
+#     black 2: e2e4 e7e5 g1f3 b8c6 f1c4 f8c5
+#
+# Only that side's moves go into the book (the other side's are what we
+# expect to meet), and each move's weight is the sum over the lines that
+# play it.
+
+ENTRY = struct.Struct(">QHHI")
+
+
+def encode_move(board, move):
+    """Polyglot's 16-bit move: to | from << 6 | promotion << 12, castling as king-takes-rook."""
+    to_square = move.to_square
+    if board.is_castling(move) and not board.chess960:
+        rank = chess.square_rank(move.from_square)
+        to_square = chess.square(7 if to_square > move.from_square else 0, rank)
+    promotion = move.promotion - 1 if move.promotion else 0
+    return to_square | (move.from_square << 6) | (promotion << 12)
+
+
+def decode_move(board, move):
+    """A book move as this board's legal move (king-takes-rook castling becomes e1g1 and so on)."""
+    if (not board.chess960 and board.kings & chess.BB_SQUARES[move.from_square]
+            and board.rooks & board.occupied_co[board.turn] & chess.BB_SQUARES[move.to_square]):
+        rank = chess.square_rank(move.from_square)
+        return chess.Move(move.from_square, chess.square(6 if move.to_square > move.from_square else 2, rank))
+    return move
+
+
+class OpeningBook:
+    """
+    One polyglot book. `selection` is "weighted" (random, in proportion to
+    the weights) or "best" (highest weight); the book is only consulted
+    up to move number `max_moves`. The file is opened on first use.
+    """
+
+    def __init__(self, path, selection="weighted", max_moves=15, min_weight=1):
+        if selection not in ("weighted", "best"):
+            raise ValueError(f"Unknown book selection: {selection}")
+        self.path = path
+        self.selection = selection
+        self.max_moves = max_moves
+        self.min_weight = min_weight
+        self.reader = None
+
+    def entries(self, board, key=None):
+        """[(move, weight)] for every legal book move in `board`."""
+        if self.reader is None:
+            self.reader = chess.polyglot.open_reader(self.path)
+        if key is None:
+            key = chess.polyglot.zobrist_hash(board)
+        moves = []
+        for entry in self.reader.find_all(key, minimum_weight=self.min_weight):
+            move = decode_move(board, entry.move)
+            if board.is_legal(move):
+                moves.append((move, entry.weight))
+        return moves
+
+    def choose(self, board, key=None):
+        """A book move for `board`, or None when out of book."""
+        if board.fullmove_number > self.max_moves:
+            return None
+        moves = self.entries(board, key)
+        if not moves:
+            return None
+        if self.selection == "best":
+            return max(moves, key=lambda m: m[1])[0]
+        return random.choices([m for m, w in moves], weights=[w for m, w in moves])[0]
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+
+def parse_repertoire(lines):
+    """{(key, raw move): weight} from the text format above."""
+    weights = {}
+    for number, line in enumerate(lines, 1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        head, _, moves = line.partition(":")
+        head = head.split()
+        if not moves or not head or head[0] not in ("white", "black") or len(head) > 2:
+            raise ValueError(f"line {number}: expected 'white|black [weight]: moves...'")
+        color = head[0] == "white"
+        weight = int(head[1]) if len(head) > 1 else 1
+
+        board = chess.Board()
+        for uci in moves.split():
+            move = chess.Move.from_uci(uci)
+            if not board.is_legal(move):
+                raise ValueError(f"line {number}: illegal move {uci} in {board.fen()}")
+            if board.turn == color:
+                index = (chess.polyglot.zobrist_hash(board), encode_move(board, move))
+                weights[index] = weights.get(index, 0) + weight
+            board.push(move)
+    return weights
+
+
+def write_book(path, weights):
+    """Writes {(key, raw move): weight} as a polyglot book (sorted by key, heaviest move first)."""
+    entries = sorted(weights.items(), key=lambda item: (item[0][0], -item[1], item[0][1]))
+    with open(path, "wb") as f:
+        for (key, raw_move), weight in entries:
+            f.write(ENTRY.pack(key, raw_move, min(weight, 0xFFFF), 0))
+    return len(entries)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m base.OpeningBook repertoire.txt book.bin")
+    with open(sys.argv[1]) as f:
+        count = write_book(sys.argv[2], parse_repertoire(f))
+    print(f"{sys.argv[2]}: {count} entries")
@@ -0,0 +1,115 @@
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+# Root-parallel search over a persistent pool of worker processes. Each
+# worker holds its own copy of the bot (and so its own transposition table)
+# for the whole game; root moves are handed out one at a time and the best
+# score found so far is shared through `alpha` so later moves only need a
+# null-window search against it (principal variation search at the root).
+# `stop` is the bot's stop request (Bot.request_stop), polled by the workers'
+# searches along with the deadline.
+
+_bot = None
+_alpha = None
+
+
+def _init_worker(bot, alpha, stop):
+    global _bot, _alpha
+    bot.transposition_table = bot.transposition_table.worker_copy()
+    bot.shared_stop = stop
+    _bot = bot
+    _alpha = alpha
+
+
+def _search_root_move(board, move, depth, state, deadline, beta, first):
+    from base.ChessBotBase import SearchAborted
+
+    bot = _bot
+    bot.load_search_state(state)
+    bot.reset_search_counters()
+    if bot.shared_stop.value:
+        # moves still queued when the stop came
+        return None, move, False, bot.search_counters()
+    bot.deadline = deadline
+    try:
+        board = bot.search_board(board)
+        bot.begin_search(board)
+        alpha = _alpha.value
+        bot.make_move(board, move)
+        if first:
+            score = -bot.minimax(board, depth - 1, -beta, -alpha)
+        else:
+            score = -bot.minimax(board, depth - 1, -math.nextafter(alpha, math.inf), -alpha)
+            if alpha < score < beta:
+                alpha = max(alpha, _alpha.value)
+                score = -bot.minimax(board, depth - 1, -beta, -alpha)
+    except SearchAborted:
+        return None, move, False, bot.search_counters()
+    finally:
+        bot.deadline = None
+
+    with _alpha.get_lock():
+        if score > _alpha.value:
+            _alpha.value = score
+    return score, move, alpha < score < beta, bot.search_counters()
+
+
+class ParallelSearch:
+
+    def __init__(self, bot, workers):
+        self.workers = workers
+        context = multiprocessing.get_context()
+        self.alpha = context.Value("d", -1e9)
+        self.stop = context.Value("b", 0, lock=False)
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(bot, self.alpha, self.stop),
+        )
+
+    def search_root(self, board, moves, depth, state, deadline, alpha=-1e9, beta=1e9):
+        """
+        Scores every root move across the pool. The first (expected best)
+        move is searched alone to establish alpha before the rest fan out.
+        Returns ((score, move, exact) list, counters), or (None, counters) if
+        the deadline hit or a stop was requested; counters are the workers' summed search_counters().
+        """
+        self.alpha.value = alpha
+        scored_moves = []
+        counters = None
+        aborted = False
+
+        first = self.executor.submit(_search_root_move, board, moves[0], depth, state, deadline, beta, True)
+        pending = [first]
+        remaining = moves[1:]
+
+        while pending:
+            done, not_done = wait(pending, return_when=FIRST_COMPLETED)
+            pending = list(not_done)
+            for future in done:
+                score, move, exact, searched = future.result()
+                counters = searched if counters is None else [a + b for a, b in zip(counters, searched)]
+                if score is None:
+                    aborted = True
+                else:
+                    scored_moves.append((score, move, exact))
+
+            if remaining and not aborted:
+                if scored_moves[0][0] >= beta:
+                    # the first move already fails high; the caller re-searches
+                    break
+                pending += [self.executor.submit(_search_root_move, board, move, depth, state, deadline, beta, False)
+                            for move in remaining]
+                remaining = []
+
+        if aborted:
+            return None, counters
+        # keep the caller's move order for equal scores
+        order = {move: i for i, move in enumerate(moves)}
+        scored_moves.sort(key=lambda x: order[x[1]])
+        return scored_moves, counters
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,155 @@
+import chess
+
+from base.Zobrist import PIECE_KEYS
+
+# Pawn structure on bitboards. Everything is computed for whole pawn sets at
+# once with shifts and fills, and cached in a pawn hash table keyed by a
+# zobrist key over the pawns alone, so evaluations can use passed, isolated,
+# doubled and backward pawns for about the cost of a dictionary lookup.
+
+BB_ALL = chess.BB_ALL
+NOT_FILE_A = ~chess.BB_FILE_A & BB_ALL
+NOT_FILE_H = ~chess.BB_FILE_H & BB_ALL
+
+
+def north_fill(bb):
+    bb |= (bb << 8) & BB_ALL
+    bb |= (bb << 16) & BB_ALL
+    bb |= (bb << 32) & BB_ALL
+    return bb
+
+
+def south_fill(bb):
+    bb |= bb >> 8
+    bb |= bb >> 16
+    bb |= bb >> 32
+    return bb
+
+
+def sideways(bb):
+    """Squares directly left and right of `bb`."""
+    return ((bb << 1) & NOT_FILE_A) | ((bb >> 1) & NOT_FILE_H)
+
+
+def forward(bb, color):
+    return (bb << 8) & BB_ALL if color else bb >> 8
+
+
+def front_fill(bb, color):
+    return north_fill(bb) if color else south_fill(bb)
+
+
+def rear_fill(bb, color):
+    return south_fill(bb) if color else north_fill(bb)
+
+
+def attacks(pawns, color):
+    """Squares attacked by a set of `color` pawns."""
+    return sideways(forward(pawns, color))
+
+
+class PawnStructure:
+    """
+    Pawn features for one pawn configuration. Each attribute is a pair of
+    bitboards indexed by colour: passed[chess.WHITE] is the set of white
+    passed pawns, and so on.
+    """
+    __slots__ = ("pawns", "attacks", "passed", "isolated", "doubled", "backward", "open_files")
+
+    def __init__(self, white_pawns, black_pawns):
+        pawns = [black_pawns, white_pawns]
+        self.pawns = pawns
+        self.attacks = [attacks(black_pawns, chess.BLACK), attacks(white_pawns, chess.WHITE)]
+        self.passed = [0, 0]
+        self.isolated = [0, 0]
+        self.doubled = [0, 0]
+        self.backward = [0, 0]
+
+        files = [south_fill(north_fill(black_pawns)), south_fill(north_fill(white_pawns))]
+        # files (as full-file masks) without any pawn
+        self.open_files = ~(files[0] | files[1]) & BB_ALL
+
+        for color in chess.COLORS:
+            ours, theirs = pawns[color], pawns[not color]
+
+            # enemy pawns block or guard everything in front of them on their file and the neighbours
+            blocked = forward(front_fill(theirs, not color), not color)
+            self.passed[color] = ours & ~(blocked | sideways(blocked))
+
+            self.isolated[color] = ours & ~sideways(files[color])
+
+            # every pawn with a friendly pawn behind it on the same file
+            self.doubled[color] = ours & forward(front_fill(ours, color), color)
+
+            # can't advance without walking into an enemy pawn attack, and no
+            # friendly pawn on a neighbouring file can come up to defend it
+            stops = forward(ours, color)
+            support = front_fill(self.attacks[color], color)
+            self.backward[color] = ours & forward(stops & self.attacks[not color] & ~support, not color)
+
+    def count(self, feature, color):
+        return chess.popcount(getattr(self, feature)[color])
+
+
+# Pawn-only zobrist keys, looked up a rank (one byte of the bitboard) at a time:
+# RANK_KEYS[color][rank][byte] is the XOR of the pawn keys of the set bits.
+RANK_KEYS = [[[0] * 256 for _ in range(8)] for _ in chess.COLORS]
+for _color in chess.COLORS:
+    for _rank in range(1, 7):
+        for _byte in range(1, 256):
+            _low = _byte & -_byte
+            RANK_KEYS[_color][_rank][_byte] = (RANK_KEYS[_color][_rank][_byte ^ _low] ^
+                                               PIECE_KEYS[_color][chess.PAWN][_rank * 8 + _low.bit_length() - 1])
+
+
+def pawn_key(white_pawns, black_pawns):
+    """Zobrist key of the pawns alone (same piece keys as the full polyglot hash)."""
+    white_keys = RANK_KEYS[chess.WHITE]
+    black_keys = RANK_KEYS[chess.BLACK]
+    key = 0
+    for rank in range(1, 7):
+        shift = rank * 8
+        key ^= white_keys[rank][(white_pawns >> shift) & 0xFF] ^ black_keys[rank][(black_pawns >> shift) & 0xFF]
+    return key
+
+
+class PawnHashTable:
+    """
+    Direct-mapped cache of PawnStructure objects keyed by pawn_key. Pawn
+    configurations change far less often than positions, so hit rates
+    are high even when the table is small.
+    """
+
+    def __init__(self, entries=1 << 14):
+        self.size = 1 << (max(1, entries).bit_length() - 1)
+        self.mask = self.size - 1
+        self.clear()
+
+    def clear(self):
+        self.keys = [None] * self.size
+        self.entries = [None] * self.size
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, board):
+        """PawnStructure for `board`'s pawns, computed on a miss."""
+        white_pawns = board.pawns & board.occupied_co[chess.WHITE]
+        black_pawns = board.pawns & board.occupied_co[chess.BLACK]
+        key = pawn_key(white_pawns, black_pawns)
+        i = key & self.mask
+        self.probes += 1
+        if self.keys[i] == key:
+            self.hits += 1
+            return self.entries[i]
+
+        structure = PawnStructure(white_pawns, black_pawns)
+        self.keys[i] = key
+        self.entries[i] = structure
+        return structure
+
+    def stats(self):
+        return {
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+        }
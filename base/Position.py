@@ -0,0 +1,676 @@
+import sys
+import time
+import chess
+import chess.polyglot
+
+import base.Zobrist as Zobrist
+
+# Bitboard search backend. A Position mirrors the parts of chess.Board the
+# search touches (bitboards, push/pop, legal move generation, check and
+# game-over tests) with its own make/unmake and an incrementally updated
+# polyglot key, but without python-chess's per-move board-state snapshots.
+#
+# Moves are encoded in 16 bits as from | to << 6 | promotion << 12 (the same
+# packing as the transposition table). Generation hands out preallocated
+# chess.Move objects from MOVES, so nothing is allocated per move and the
+# rest of the search can keep treating moves as chess.Move.
+
+BB_SQUARES = chess.BB_SQUARES
+BB_ALL = chess.BB_ALL
+KNIGHT_ATTACKS = chess.BB_KNIGHT_ATTACKS
+KING_ATTACKS = chess.BB_KING_ATTACKS
+PAWN_ATTACKS = chess.BB_PAWN_ATTACKS
+RANK_ATTACKS = chess.BB_RANK_ATTACKS
+FILE_ATTACKS = chess.BB_FILE_ATTACKS
+DIAG_ATTACKS = chess.BB_DIAG_ATTACKS
+RANK_MASKS = chess.BB_RANK_MASKS
+FILE_MASKS = chess.BB_FILE_MASKS
+DIAG_MASKS = chess.BB_DIAG_MASKS
+RAYS = chess.BB_RAYS
+BETWEEN = [[chess.between(a, b) for b in chess.SQUARES] for a in chess.SQUARES]
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = chess.PIECE_TYPES
+PROMOTIONS = (QUEEN, ROOK, BISHOP, KNIGHT)
+PROMOTION_RANK = [chess.BB_RANK_1, chess.BB_RANK_8]  # [BLACK, WHITE]
+HOME_RANK = [chess.BB_RANK_8, chess.BB_RANK_1]       # [BLACK, WHITE]
+DOUBLE_PUSH_RANK = [chess.BB_RANK_7, chess.BB_RANK_2]
+
+PIECE_KEYS = Zobrist.PIECE_KEYS
+TURN_KEY = Zobrist.TURN_KEY
+
+MOVES = [chess.Move(code & 63, (code >> 6) & 63, (code >> 12) or None) for code in range(6 << 12)]
+PIECES = [[None] + [chess.Piece(piece_type, color) for piece_type in chess.PIECE_TYPES]
+          for color in (chess.BLACK, chess.WHITE)]
+
+
+def encode(move):
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def scan(bb):
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+def rook_attacks(square, occupied):
+    return RANK_ATTACKS[square][RANK_MASKS[square] & occupied] | FILE_ATTACKS[square][FILE_MASKS[square] & occupied]
+
+
+def bishop_attacks(square, occupied):
+    return DIAG_ATTACKS[square][DIAG_MASKS[square] & occupied]
+
+
+class Position:
+    __slots__ = ("bbs", "occupied_co", "occupied", "types", "turn", "castling_rights", "ep_square",
+                 "halfmove_clock", "fullmove_number", "key", "keys", "move_stack", "undo",
+                 "root_len", "view_board", "view_path", "flat_board", "legal_cache", "checkers_cache")
+
+    @classmethod
+    def from_board(cls, board):
+        """
+        Builds a position from a standard-chess chess.Board, keeping its move
+        history (for repetition checks and the evaluation view).
+        """
+        self = cls()
+        self.bbs = [0, board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings]
+        self.occupied_co = [board.occupied_co[chess.BLACK], board.occupied_co[chess.WHITE]]
+        self.occupied = board.occupied
+        self.types = [board.piece_type_at(square) or 0 for square in chess.SQUARES]
+        self.turn = board.turn
+        self.castling_rights = board.clean_castling_rights()
+        self.ep_square = board.ep_square
+        self.halfmove_clock = board.halfmove_clock
+        self.fullmove_number = board.fullmove_number
+        self.key = chess.polyglot.zobrist_hash(board)
+
+        # keys of the earlier positions that can still repeat
+        history = []
+        temp = board.copy()
+        for _ in range(min(board.halfmove_clock, len(board.move_stack))):
+            temp.pop()
+            history.append(chess.polyglot.zobrist_hash(temp))
+        history.reverse()
+        self.keys = history + [self.key]
+
+        self.move_stack = list(board.move_stack)
+        self.undo = []
+        self.root_len = len(board.move_stack)
+        self.view_board = board.copy()
+        self.view_path = []
+        self.flat_board = board.copy(stack=False)
+        self.legal_cache = None
+        self.checkers_cache = None
+        return self
+
+    # ---------------- chess.Board compatible queries ----------------
+
+    @property
+    def pawns(self):
+        return self.bbs[PAWN]
+
+    @property
+    def knights(self):
+        return self.bbs[KNIGHT]
+
+    @property
+    def bishops(self):
+        return self.bbs[BISHOP]
+
+    @property
+    def rooks(self):
+        return self.bbs[ROOK]
+
+    @property
+    def queens(self):
+        return self.bbs[QUEEN]
+
+    @property
+    def kings(self):
+        return self.bbs[KING]
+
+    @property
+    def legal_moves(self):
+        if self.legal_cache is None:
+            self.legal_cache = self.generate_legal_moves()
+        return self.legal_cache
+
+    def pieces_mask(self, piece_type, color):
+        return self.bbs[piece_type] & self.occupied_co[color]
+
+    def piece_type_at(self, square):
+        return self.types[square] or None
+
+    def color_at(self, square):
+        mask = BB_SQUARES[square]
+        if self.occupied_co[chess.WHITE] & mask:
+            return chess.WHITE
+        if self.occupied_co[chess.BLACK] & mask:
+            return chess.BLACK
+        return None
+
+    def piece_at(self, square):
+        piece_type = self.types[square]
+        if not piece_type:
+            return None
+        return PIECES[bool(self.occupied_co[chess.WHITE] & BB_SQUARES[square])][piece_type]
+
+    def king(self, color):
+        kings = self.bbs[KING] & self.occupied_co[color]
+        return kings.bit_length() - 1 if kings else None
+
+    def peek(self):
+        return self.move_stack[-1]
+
+    def is_en_passant(self, move):
+        return (move.to_square == self.ep_square and self.types[move.from_square] == PAWN
+                and (move.to_square - move.from_square) & 7 != 0)
+
+    def is_capture(self, move):
+        return bool(BB_SQUARES[move.to_square] & self.occupied_co[not self.turn]) or self.is_en_passant(move)
+
+    def is_castling(self, move):
+        return self.types[move.from_square] == KING and abs(move.to_square - move.from_square) == 2
+
+    def attacked_by(self, color, square, occupied):
+        bbs = self.bbs
+        pieces = self.occupied_co[color]
+        return bool(
+            (KNIGHT_ATTACKS[square] & bbs[KNIGHT] & pieces) or
+            (KING_ATTACKS[square] & bbs[KING] & pieces) or
+            (PAWN_ATTACKS[not color][square] & bbs[PAWN] & pieces) or
+            (bishop_attacks(square, occupied) & (bbs[BISHOP] | bbs[QUEEN]) & pieces) or
+            (rook_attacks(square, occupied) & (bbs[ROOK] | bbs[QUEEN]) & pieces)
+        )
+
+    def attackers_mask(self, color, square, occupied=None):
+        if occupied is None:
+            occupied = self.occupied
+        bbs = self.bbs
+        return self.occupied_co[color] & (
+            (KNIGHT_ATTACKS[square] & bbs[KNIGHT]) |
+            (KING_ATTACKS[square] & bbs[KING]) |
+            (PAWN_ATTACKS[not color][square] & bbs[PAWN]) |
+            (bishop_attacks(square, occupied) & (bbs[BISHOP] | bbs[QUEEN])) |
+            (rook_attacks(square, occupied) & (bbs[ROOK] | bbs[QUEEN]))
+        )
+
+    def is_attacked_by(self, color, square):
+        return self.attacked_by(color, square, self.occupied)
+
+    def checkers(self):
+        if self.checkers_cache is None:
+            king = self.king(self.turn)
+            self.checkers_cache = 0 if king is None else self.attackers_mask(not self.turn, king)
+        return self.checkers_cache
+
+    def is_check(self):
+        return bool(self.checkers())
+
+    def gives_check(self, move):
+        self.push(move)
+        try:
+            return self.is_check()
+        finally:
+            self.pop()
+
+    def has_insufficient_material(self, color):
+        bbs = self.bbs
+        ours = self.occupied_co[color]
+        if ours & (bbs[PAWN] | bbs[ROOK] | bbs[QUEEN]):
+            return False
+        if ours & bbs[KNIGHT]:
+            return (chess.popcount(ours) <= 2
+                    and not self.occupied_co[not color] & ~bbs[KING] & ~bbs[QUEEN])
+        if ours & bbs[BISHOP]:
+            same_color = (not bbs[BISHOP] & chess.BB_DARK_SQUARES) or (not bbs[BISHOP] & chess.BB_LIGHT_SQUARES)
+            return same_color and not bbs[PAWN] and not bbs[KNIGHT]
+        return True
+
+    def is_insufficient_material(self):
+        return self.has_insufficient_material(chess.WHITE) and self.has_insufficient_material(chess.BLACK)
+
+    def is_repetition(self, count=3):
+        keys = self.keys
+        last = len(keys) - 1
+        stop = last - min(self.halfmove_clock, last)
+        key = keys[last]
+        found = 1
+        i = last - 2
+        while i >= stop:
+            if keys[i] == key:
+                found += 1
+                if found >= count:
+                    return True
+            i -= 2
+        return False
+
+    def is_checkmate(self):
+        return self.is_check() and not self.legal_moves
+
+    def is_stalemate(self):
+        return not self.is_check() and not self.legal_moves
+
+    def is_game_over(self):
+        """Same rules as chess.Board.is_game_over() without draw claims."""
+        if self.legal_cache is None:
+            no_moves = next(self.generate_moves(), None) is None
+        else:
+            no_moves = not self.legal_cache
+        return (self.halfmove_clock >= 150 or self.is_insufficient_material()
+                or no_moves or self.is_repetition(5))
+
+    # ---------------- move generation ----------------
+
+    def pinned(self, king):
+        bbs = self.bbs
+        occupied = self.occupied
+        ours = self.occupied_co[self.turn]
+        theirs = self.occupied_co[not self.turn]
+        snipers = theirs & (
+            ((RANK_ATTACKS[king][0] | FILE_ATTACKS[king][0]) & (bbs[ROOK] | bbs[QUEEN])) |
+            (DIAG_ATTACKS[king][0] & (bbs[BISHOP] | bbs[QUEEN]))
+        )
+        pinned = 0
+        for sniper in scan(snipers):
+            blockers = BETWEEN[king][sniper] & occupied
+            if blockers and not blockers & (blockers - 1) and blockers & ours:
+                pinned |= blockers
+        return pinned
+
+    def generate_moves(self, from_mask=BB_ALL, to_mask=BB_ALL):
+        """Lazily yields the legal moves (from and to squares in the masks)."""
+        us = self.turn
+        them = not us
+        bbs = self.bbs
+        types = self.types
+        occupied = self.occupied
+        ours = self.occupied_co[us]
+        theirs = self.occupied_co[them]
+
+        king = self.king(us)
+        if king is None:
+            return
+        checkers = self.checkers()
+
+        # king steps, checked against the board without the king on it
+        if from_mask & BB_SQUARES[king]:
+            without_king = occupied ^ BB_SQUARES[king]
+            for to in scan(KING_ATTACKS[king] & ~ours & to_mask):
+                if not self.attacked_by(them, to, without_king):
+                    yield MOVES[king | to << 6]
+
+            rights = self.castling_rights & ours & HOME_RANK[us]
+            if rights and not checkers:
+                for rook in scan(rights):
+                    step = 1 if rook > king else -1
+                    king_to = king + 2 * step
+                    if (not BETWEEN[king][rook] & occupied and BB_SQUARES[king_to] & to_mask
+                            and not self.attacked_by(them, king + step, occupied)
+                            and not self.attacked_by(them, king_to, occupied)):
+                        yield MOVES[king | king_to << 6]
+
+        if checkers & (checkers - 1):
+            return  # double check: only the king can move
+
+        target = ~ours & to_mask
+        if checkers:
+            target &= BETWEEN[king][checkers.bit_length() - 1] | checkers
+        pinned = self.pinned(king)
+        king_rays = RAYS[king]
+
+        # the scan loops are written out inline: this is the hottest code in the search
+        pieces = bbs[KNIGHT] & ours & from_mask & ~pinned
+        while pieces:
+            low = pieces & -pieces
+            pieces ^= low
+            frm = low.bit_length() - 1
+            dests = KNIGHT_ATTACKS[frm] & target
+            while dests:
+                to = dests & -dests
+                dests ^= to
+                yield MOVES[frm | (to.bit_length() - 1) << 6]
+
+        pieces = (bbs[BISHOP] | bbs[ROOK] | bbs[QUEEN]) & ours & from_mask
+        while pieces:
+            low = pieces & -pieces
+            pieces ^= low
+            frm = low.bit_length() - 1
+            piece_type = types[frm]
+            if piece_type == BISHOP:
+                dests = bishop_attacks(frm, occupied)
+            elif piece_type == ROOK:
+                dests = rook_attacks(frm, occupied)
+            else:
+                dests = bishop_attacks(frm, occupied) | rook_attacks(frm, occupied)
+            dests &= target
+            if pinned & low:
+                dests &= king_rays[frm]
+            while dests:
+                to = dests & -dests
+                dests ^= to
+                yield MOVES[frm | (to.bit_length() - 1) << 6]
+
+        forward = 8 if us else -8
+        promotion_rank = PROMOTION_RANK[us]
+        double_rank = DOUBLE_PUSH_RANK[us]
+        pawn_attacks = PAWN_ATTACKS[us]
+        pieces = bbs[PAWN] & ours & from_mask
+        while pieces:
+            low = pieces & -pieces
+            pieces ^= low
+            frm = low.bit_length() - 1
+            dests = pawn_attacks[frm] & theirs
+            one = frm + forward
+            if not occupied & BB_SQUARES[one]:
+                dests |= BB_SQUARES[one]
+                if low & double_rank and not occupied & BB_SQUARES[one + forward]:
+                    dests |= BB_SQUARES[one + forward]
+            dests &= target
+            if pinned & low:
+                dests &= king_rays[frm]
+            while dests:
+                to_bb = dests & -dests
+                dests ^= to_bb
+                to = to_bb.bit_length() - 1
+                if to_bb & promotion_rank:
+                    for promotion in PROMOTIONS:
+                        yield MOVES[frm | to << 6 | promotion << 12]
+                else:
+                    yield MOVES[frm | to << 6]
+
+        ep = self.ep_square
+        if ep is not None and BB_SQUARES[ep] & to_mask and not occupied & BB_SQUARES[ep]:
+            captured = ep - forward
+            for frm in scan(PAWN_ATTACKS[them][ep] & bbs[PAWN] & ours & from_mask):
+                # rare enough to verify by clearing the squares and looking at the king
+                after = occupied ^ BB_SQUARES[frm] ^ BB_SQUARES[ep] ^ BB_SQUARES[captured]
+                attackers = self.occupied_co[them] & ~BB_SQUARES[captured] & (
+                    (KNIGHT_ATTACKS[king] & bbs[KNIGHT]) |
+                    (PAWN_ATTACKS[us][king] & bbs[PAWN]) |
+                    (bishop_attacks(king, after) & (bbs[BISHOP] | bbs[QUEEN])) |
+                    (rook_attacks(king, after) & (bbs[ROOK] | bbs[QUEEN]))
+                )
+                if not attackers:
+                    yield MOVES[frm | ep << 6]
+
+    def generate_legal_moves(self, from_mask=BB_ALL, to_mask=BB_ALL):
+        return list(self.generate_moves(from_mask, to_mask))
+
+    def generate_legal_captures(self):
+        """Captures (including en passant and capturing promotions)."""
+        to_mask = self.occupied_co[not self.turn]
+        if self.ep_square is not None:
+            to_mask |= BB_SQUARES[self.ep_square]
+        return self.generate_legal_moves(BB_ALL, to_mask)
+
+    # ---------------- make / unmake ----------------
+
+    def push(self, move):
+        code = encode(move)
+        us = self.turn
+        them = not us
+        key = self.key ^ Zobrist.ep_key(self) ^ TURN_KEY
+
+        self.undo.append((code, 0, None, self.castling_rights, self.ep_square, self.halfmove_clock, self.key))
+        self.ep_square = None
+        self.halfmove_clock += 1
+        if not us:
+            self.fullmove_number += 1
+
+        if code:
+            bbs = self.bbs
+            types = self.types
+            occupied_co = self.occupied_co
+            frm = code & 63
+            to = (code >> 6) & 63
+            from_bb = BB_SQUARES[frm]
+            to_bb = BB_SQUARES[to]
+            piece_type = types[frm]
+            captured = types[to]
+            captured_square = None
+
+            if captured:
+                bbs[captured] ^= to_bb
+                occupied_co[them] ^= to_bb
+                key ^= PIECE_KEYS[them][captured][to]
+                self.halfmove_clock = 0
+
+            new_type = code >> 12 or piece_type
+            bbs[piece_type] ^= from_bb
+            bbs[new_type] ^= to_bb
+            occupied_co[us] ^= from_bb | to_bb
+            types[frm] = 0
+            types[to] = new_type
+            key ^= PIECE_KEYS[us][piece_type][frm] ^ PIECE_KEYS[us][new_type][to]
+
+            if piece_type == PAWN:
+                self.halfmove_clock = 0
+                diff = to - frm
+                if diff == 16 or diff == -16:
+                    self.ep_square = frm + diff // 2
+                elif not captured and diff & 7:
+                    # en passant
+                    captured = PAWN
+                    captured_square = to - 8 if us else to + 8
+                    captured_bb = BB_SQUARES[captured_square]
+                    bbs[PAWN] ^= captured_bb
+                    occupied_co[them] ^= captured_bb
+                    types[captured_square] = 0
+                    key ^= PIECE_KEYS[them][PAWN][captured_square]
+            elif piece_type == KING and (to - frm == 2 or frm - to == 2):
+                rook_from, rook_to = (frm + 3, frm + 1) if to > frm else (frm - 4, frm - 1)
+                rook_bb = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+                bbs[ROOK] ^= rook_bb
+                occupied_co[us] ^= rook_bb
+                types[rook_from] = 0
+                types[rook_to] = ROOK
+                key ^= PIECE_KEYS[us][ROOK][rook_from] ^ PIECE_KEYS[us][ROOK][rook_to]
+
+            rights = self.castling_rights
+            if rights:
+                new_rights = rights & ~from_bb & ~to_bb
+                if piece_type == KING:
+                    new_rights &= ~HOME_RANK[us]
+                if new_rights != rights:
+                    key ^= Zobrist.castling_key(rights) ^ Zobrist.castling_key(new_rights)
+                    self.castling_rights = new_rights
+
+            self.occupied = occupied_co[0] | occupied_co[1]
+            self.undo[-1] = (code, captured, captured_square) + self.undo[-1][3:]
+
+        self.turn = them
+        if self.ep_square is not None:
+            key ^= Zobrist.ep_key(self)
+        self.key = key
+        self.keys.append(key)
+        self.move_stack.append(MOVES[code])
+        self.legal_cache = None
+        self.checkers_cache = None
+
+    def pop(self):
+        code, captured, captured_square, rights, ep_square, halfmove_clock, key = self.undo.pop()
+        them = self.turn
+        us = not them
+        self.turn = us
+        self.castling_rights = rights
+        self.ep_square = ep_square
+        self.halfmove_clock = halfmove_clock
+        self.key = key
+        if not us:
+            self.fullmove_number -= 1
+        self.keys.pop()
+        move = self.move_stack.pop()
+        self.legal_cache = None
+        self.checkers_cache = None
+
+        if code:
+            bbs = self.bbs
+            types = self.types
+            occupied_co = self.occupied_co
+            frm = code & 63
+            to = (code >> 6) & 63
+            from_bb = BB_SQUARES[frm]
+            to_bb = BB_SQUARES[to]
+            new_type = types[to]
+            piece_type = PAWN if code >> 12 else new_type
+
+            bbs[new_type] ^= to_bb
+            bbs[piece_type] ^= from_bb
+            occupied_co[us] ^= from_bb | to_bb
+            types[to] = 0
+            types[frm] = piece_type
+
+            if captured_square is not None:
+                captured_bb = BB_SQUARES[captured_square]
+                bbs[PAWN] ^= captured_bb
+                occupied_co[them] ^= captured_bb
+                types[captured_square] = PAWN
+            elif captured:
+                bbs[captured] ^= to_bb
+                occupied_co[them] ^= to_bb
+                types[to] = captured
+            elif piece_type == KING and (to - frm == 2 or frm - to == 2):
+                rook_from, rook_to = (frm + 3, frm + 1) if to > frm else (frm - 4, frm - 1)
+                rook_bb = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+                bbs[ROOK] ^= rook_bb
+                occupied_co[us] ^= rook_bb
+                types[rook_to] = 0
+                types[rook_from] = ROOK
+
+            self.occupied = occupied_co[0] | occupied_co[1]
+        return move
+
+    # ---------------- evaluation view ----------------
+
+    def view(self, history=True):
+        """
+        A chess.Board in the same position, for evaluate(). With `history`
+        it carries the full move stack and is kept in sync lazily: only the
+        moves that differ from the previous call are popped and pushed, so
+        sibling leaves cost about one push each. Without it the bitboards are
+        copied onto a board whose move stack is empty (cheaper, but peek(),
+        pop() and repetition checks don't work on it).
+        """
+        if not history:
+            return self.flat()
+
+        board = self.view_board
+        path = self.view_path
+        target = self.move_stack
+        root = self.root_len
+
+        common = 0
+        limit = min(len(path), len(target) - root)
+        while common < limit and path[common] is target[root + common]:
+            common += 1
+        while len(path) > common:
+            board.pop()
+            path.pop()
+        for move in target[root + common:]:
+            board.push(move)
+            path.append(move)
+        return board
+
+    def flat(self):
+        board = self.flat_board
+        bbs = self.bbs
+        board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings = bbs[1:]
+        board.occupied_co[chess.WHITE] = self.occupied_co[chess.WHITE]
+        board.occupied_co[chess.BLACK] = self.occupied_co[chess.BLACK]
+        board.occupied = self.occupied
+        board.promoted = 0
+        board.turn = self.turn
+        board.castling_rights = self.castling_rights
+        board.ep_square = self.ep_square
+        board.halfmove_clock = self.halfmove_clock
+        board.fullmove_number = self.fullmove_number
+        return board
+
+    def fen(self):
+        return self.view().fen()
+
+
+# ---------------- perft ----------------
+
+# Standard perft positions with known node counts by depth
+PERFT_POSITIONS = [
+    ("start", chess.STARTING_FEN,
+     {1: 20, 2: 400, 3: 8902, 4: 197281, 5: 4865609}),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     {1: 48, 2: 2039, 3: 97862, 4: 4085603}),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624}),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     {1: 6, 2: 264, 3: 9467, 4: 422333}),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     {1: 44, 2: 1486, 3: 62379, 4: 2103487}),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     {1: 46, 2: 2079, 3: 89890, 4: 3894594}),
+]
+
+
+def perft(position, depth):
+    if depth == 0:
+        return 1
+    moves = position.generate_legal_moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        position.push(move)
+        nodes += perft(position, depth - 1)
+        position.pop()
+    return nodes
+
+
+def verify(fen, depth):
+    """
+    Walks the tree to `depth` in lockstep with python-chess, checking the
+    legal move set, the zobrist key, check and game-over status at every
+    node. Returns the leaf count; raises AssertionError on any difference.
+    """
+    board = chess.Board(fen)
+    position = Position.from_board(board)
+
+    def walk(depth):
+        expected = set(board.legal_moves)
+        moves = position.generate_legal_moves()
+        if len(moves) != len(expected) or set(moves) != expected:
+            raise AssertionError(f"Move lists differ in {board.fen()}: "
+                                 f"missing {expected - set(moves)}, extra {set(moves) - expected}")
+        if position.key != chess.polyglot.zobrist_hash(board):
+            raise AssertionError(f"Zobrist key differs in {board.fen()}")
+        if position.is_check() != board.is_check() or position.is_game_over() != board.is_game_over():
+            raise AssertionError(f"Check/game-over status differs in {board.fen()}")
+        if depth == 0:
+            return 1
+        nodes = 0
+        for move in moves:
+            board.push(move)
+            position.push(move)
+            nodes += walk(depth - 1)
+            position.pop()
+            board.pop()
+        return nodes
+
+    return walk(depth)
+
+
+if __name__ == "__main__":
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    failed = False
+    for name, fen, counts in PERFT_POSITIONS:
+        start = time.perf_counter()
+        try:
+            nodes = verify(fen, depth)
+        except AssertionError as e:
+            print(f"{name:10} FAIL {e}")
+            failed = True
+            continue
+        ok = counts.get(depth) in (None, nodes)
+        failed |= not ok
+        print(f"{name:10} depth {depth}: {nodes} nodes {'ok' if ok else 'MISMATCH'} "
+              f"({time.perf_counter() - start:.2f}s)")
+    sys.exit(1 if failed else 0)
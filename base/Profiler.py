@@ -0,0 +1,91 @@
+import time
+from contextlib import nullcontext
+
+# Per-section timing for evaluate() functions. An evaluation marks its term
+# groups either with `with profiler.section("name"):` blocks or, for code
+# that simply runs one group after another, with a lap function:
+#
+#     lap = self.profiler.laps()
+#     ...material...
+#     lap("material")       # time since the previous lap goes to "material"
+#     ...development...
+#     lap("development")
+#
+# While the profiler is disabled section() hands back a shared nullcontext
+# and laps() a function that does nothing, so the marks can stay in the code.
+# Times and call counts add up over every search until reset().
+
+_NULL_SECTION = nullcontext()
+
+
+def _no_lap(name):
+    pass
+
+
+class _Section:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+
+
+class Profiler:
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.times = {}
+        self.calls = {}
+
+    def add(self, name, seconds):
+        self.times[name] = self.times.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def section(self, name):
+        if not self.enabled:
+            return _NULL_SECTION
+        return _Section(self, name)
+
+    def laps(self):
+        """A function charging the time since its last call (or since laps()) to a section."""
+        if not self.enabled:
+            return _no_lap
+        add = self.add
+        last = time.perf_counter()
+
+        def lap(name):
+            nonlocal last
+            now = time.perf_counter()
+            add(name, now - last)
+            last = now
+        return lap
+
+    def report(self):
+        """{section: {"calls", "time", "per_call", "share"}}, most expensive first."""
+        total = sum(self.times.values())
+        rows = sorted(self.times.items(), key=lambda item: item[1], reverse=True)
+        return {
+            name: {
+                "calls": self.calls[name],
+                "time": seconds,
+                "per_call": seconds / self.calls[name],
+                "share": seconds / total if total else 0.0,
+            }
+            for name, seconds in rows
+        }
+
+    def format(self, title="Profile"):
+        lines = [f"{title}:", f"  {'section':<24}{'calls':>10}{'total s':>10}{'us/call':>10}{'share':>8}"]
+        for name, row in self.report().items():
+            lines.append(f"  {name:<24}{row['calls']:>10}{row['time']:>10.3f}"
+                         f"{row['per_call'] * 1e6:>10.1f}{row['share']:>8.1%}")
+        return "\n".join(lines)
@@ -0,0 +1,120 @@
+import chess
+
+# Static exchange evaluation on bitboards. Values are in pawns; multiply by a
+# bot's pawn_value to get evaluate() units.
+
+SEE_VALUES = [0, 1, 3, 3, 5, 9, 100]  # indexed by piece type, 0 = empty
+
+
+def attackers_to(board, square, occupied):
+    """
+    Bitboard of all pieces (both colours) attacking `square` when only the
+    squares in `occupied` are filled. Shrinking `occupied` uncovers x-ray
+    attackers standing behind pieces that have already captured.
+    """
+    queens_and_rooks = board.queens | board.rooks
+    queens_and_bishops = board.queens | board.bishops
+    attackers = (
+        (chess.BB_KING_ATTACKS[square] & board.kings) |
+        (chess.BB_KNIGHT_ATTACKS[square] & board.knights) |
+        (chess.BB_RANK_ATTACKS[square][chess.BB_RANK_MASKS[square] & occupied] & queens_and_rooks) |
+        (chess.BB_FILE_ATTACKS[square][chess.BB_FILE_MASKS[square] & occupied] & queens_and_rooks) |
+        (chess.BB_DIAG_ATTACKS[square][chess.BB_DIAG_MASKS[square] & occupied] & queens_and_bishops) |
+        (chess.BB_PAWN_ATTACKS[chess.BLACK][square] & board.pawns & board.occupied_co[chess.WHITE]) |
+        (chess.BB_PAWN_ATTACKS[chess.WHITE][square] & board.pawns & board.occupied_co[chess.BLACK])
+    )
+    return attackers & occupied
+
+
+def least_valuable(board, attackers):
+    """(square bitboard, piece type) of the cheapest piece in `attackers`."""
+    for piece_type, pieces in ((chess.PAWN, board.pawns), (chess.KNIGHT, board.knights),
+                               (chess.BISHOP, board.bishops), (chess.ROOK, board.rooks),
+                               (chess.QUEEN, board.queens), (chess.KING, board.kings)):
+        subset = attackers & pieces
+        if subset:
+            return subset & -subset, piece_type
+    return 0, None
+
+
+def _swap(board, square, from_bb, piece_type, side, gain, occupied):
+    """
+    Plays out the capture sequence on `square` with each side always
+    recapturing with its least valuable piece, and either side free to stop.
+    `gain` is what the first capture (by `side`, with `piece_type` from
+    `from_bb`) wins outright.
+    """
+    gains = [gain]
+    piece_value = SEE_VALUES[piece_type]
+
+    while True:
+        # what the other side wins by taking the piece that just captured
+        gains.append(piece_value - gains[-1])
+        if max(-gains[-2], gains[-1]) < 0:
+            break
+
+        occupied ^= from_bb
+        attackers = attackers_to(board, square, occupied)
+        side = not side
+        from_bb, piece_type = least_valuable(board, attackers & board.occupied_co[side])
+        if not from_bb:
+            break
+        if piece_type == chess.KING and attackers & board.occupied_co[not side]:
+            # the king can't recapture into a defended square
+            break
+        piece_value = SEE_VALUES[piece_type]
+
+    for i in range(len(gains) - 2, 0, -1):
+        gains[i - 1] = -max(-gains[i - 1], gains[i])
+    return gains[0]
+
+
+def see(board, move):
+    """
+    Material (in pawns) the side to move wins or loses by playing `move` and
+    letting both sides trade off on the destination square, x-rays included.
+    Quiet moves score what they lose if the piece is taken there.
+    """
+    from_square = move.from_square
+    to_square = move.to_square
+    piece_type = board.piece_type_at(from_square)
+    if piece_type is None or board.is_castling(move):
+        return 0
+
+    occupied = board.occupied
+    victim = board.piece_type_at(to_square)
+    if victim is None and piece_type == chess.PAWN and to_square == board.ep_square:
+        victim = chess.PAWN
+        occupied ^= chess.BB_SQUARES[to_square - 8 if board.turn == chess.WHITE else to_square + 8]
+
+    gain = SEE_VALUES[victim or 0]
+    if move.promotion:
+        gain += SEE_VALUES[move.promotion] - SEE_VALUES[chess.PAWN]
+        piece_type = move.promotion
+
+    return _swap(board, to_square, chess.BB_SQUARES[from_square], piece_type, board.turn, gain, occupied)
+
+
+def see_ge(board, move, threshold=0):
+    """Whether `move` wins at least `threshold` pawns in the exchange."""
+    return see(board, move) >= threshold
+
+
+def exchange(board, square, color):
+    """
+    What `color` wins (in pawns, never below 0) by starting a capture sequence
+    on `square` with its least valuable attacker; 0 if it can't or shouldn't.
+    """
+    victim = board.piece_type_at(square)
+    if victim is None or board.color_at(square) == color:
+        return 0
+
+    occupied = board.occupied
+    attackers = attackers_to(board, square, occupied) & board.occupied_co[color]
+    from_bb, piece_type = least_valuable(board, attackers)
+    if not from_bb:
+        return 0
+    if piece_type == chess.KING and attackers_to(board, square, occupied) & board.occupied_co[not color]:
+        return 0
+
+    return max(0, _swap(board, square, from_bb, piece_type, color, SEE_VALUES[victim], occupied))
@@ -0,0 +1,82 @@
+import threading
+
+# A search running in the background, as returned by Bot.start_search():
+#
+#     handle = bot.start_search(board, {"remaining_time": 60, "increment": 1}, info_callback=print)
+#     ...
+#     handle.stop()             # ask for the best move so far
+#     move = handle.result()    # blocks until the search has returned
+#
+# limits are choose_move()'s keyword arguments (depth, remaining_time,
+# increment). The stop request is a flag the search polls every
+# TIME_CHECK_NODES nodes, in the worker processes too, so the search
+# returns within milliseconds and falls back to its last finished depth
+# (if not even depth 1 was done, to the transposition table's move or the
+# first legal move; None only when there are no legal moves).
+
+
+class SearchHandle:
+
+    def __init__(self, bot, board, limits=None, info_callback=None, on_done=None):
+        self.bot = bot
+        self.board = board.copy()
+        self.limits = dict(limits or {})
+        self.info_callback = info_callback
+        # called with the handle, from the search thread, once it has finished
+        # (not a place to touch Tk: GUIs poll `running` from their main loop)
+        self.on_done = on_done
+        self.move = None
+        self.info = None
+        self.error = None
+        self.stopped = False
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        # the bot's own callback, if it has one, is put back afterwards
+        previous_callback = self.bot.info_callback
+        self.bot.info_callback = self.info_callback
+        try:
+            self.move = self.bot.choose_move(self.board, **self.limits)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.bot.info_callback = previous_callback
+            self.info = self.bot.last_search_info
+            with self.lock:
+                self.bot.clear_stop()
+                self.finished.set()
+        if self.on_done is not None:
+            self.on_done(self)
+
+    def stop(self):
+        """Asks the search to return now; does nothing once it has finished."""
+        with self.lock:
+            if not self.finished.is_set():
+                self.stopped = True
+                self.bot.request_stop()
+
+    @property
+    def running(self):
+        return not self.finished.is_set()
+
+    def wait(self, timeout=None):
+        """Waits for the search to finish; False if `timeout` seconds passed first."""
+        return self.finished.wait(timeout)
+
+    def result(self, timeout=None):
+        """
+        The chosen move, once the search has finished (raising whatever the
+        search raised). Raises TimeoutError if it is still running after
+        `timeout` seconds.
+        """
+        if not self.finished.wait(timeout):
+            raise TimeoutError("search still running")
+        if self.error is not None:
+            raise self.error
+        return self.move
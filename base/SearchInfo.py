@@ -0,0 +1,90 @@
+import math
+
+# What one choose_move() call did. The search only bumps a few integer
+# counters on the bot (see Bot.search_counters); this object is put together
+# from them after each finished iteration and once at the end, so leaving
+# it on costs next to nothing.
+
+# the order Bot.search_counters() returns them in (and worker processes send them back)
+COUNTERS = ("nodes", "qnodes", "tt_probes", "tt_hits", "tt_cutoffs", "cutoffs", "first_move_cutoffs")
+
+
+class SearchInfo:
+    """
+    nodes counts every position visited, quiescence included (qnodes is
+    the quiescence part). cutoffs counts beta cutoffs in the main search and
+    first_move_cutoffs those caused by the first move tried, the usual
+    measure of how good move ordering is. iterations holds one dict per
+    finished depth with its node count and time. lines holds the
+    (score, pv) of each line of a multi-PV Bot.analyse(), best first.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.score = None
+        self.move = None
+        self.pv = []
+        self.time = 0.0
+        self.iterations = []
+        self.lines = []
+        for name in COUNTERS:
+            setattr(self, name, 0)
+
+    def set_counters(self, counters):
+        for name, value in zip(COUNTERS, counters):
+            setattr(self, name, value)
+
+    def add_iteration(self, depth, nodes, time, score, pv):
+        self.iterations.append({"depth": depth, "nodes": nodes, "time": time, "score": score})
+        self.depth = depth
+        self.score = score
+        self.pv = pv
+        self.move = pv[0] if pv else None
+
+    @property
+    def nps(self):
+        return self.nodes / self.time if self.time > 0 else 0.0
+
+    @property
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    @property
+    def branching_factor(self):
+        """
+        Effective branching factor: the average growth in nodes from one
+        finished iteration to the next (0 with fewer than two iterations).
+        """
+        nodes = [it["nodes"] for it in self.iterations if it["nodes"]]
+        if len(nodes) < 2:
+            return 0.0
+        return math.pow(nodes[-1] / nodes[0], 1 / (len(nodes) - 1))
+
+    def as_dict(self):
+        info = {
+            "depth": self.depth,
+            "score": self.score,
+            "move": self.move.uci() if self.move else None,
+            "pv": [move.uci() for move in self.pv],
+            "time": self.time,
+            "nps": self.nps,
+            "tt_hit_rate": self.tt_hit_rate,
+            "first_move_cutoff_rate": self.first_move_cutoff_rate,
+            "branching_factor": self.branching_factor,
+            "iterations": [dict(it) for it in self.iterations],
+            "lines": [{"score": score, "pv": [move.uci() for move in pv]} for score, pv in self.lines],
+        }
+        for name in COUNTERS:
+            info[name] = getattr(self, name)
+        return info
+
+    def __str__(self):
+        score = "-" if self.score is None else f"{self.score:.2f}"
+        return (f"depth {self.depth} score {score} nodes {self.nodes} (q {self.qnodes}) "
+                f"nps {self.nps:.0f} time {self.time:.2f}s tt {self.tt_hit_rate:.0%} "
+                f"first-move cutoffs {self.first_move_cutoff_rate:.0%} ebf {self.branching_factor:.2f} "
+                f"pv {' '.join(move.uci() for move in self.pv)}")
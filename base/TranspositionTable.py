@@ -0,0 +1,285 @@
+import array
+import atexit
+import mmap
+import os
+import struct
+import chess
+
+# Bound types: what a stored score means relative to the true value
+EXACT = 0
+LOWER = 1   # fail-high, true score >= stored score
+UPPER = 2   # fail-low, true score <= stored score
+
+# key (Q) + score (d) + depth (b) + bound (B) + move (H) + age (B)
+ENTRY_BYTES = 8 + 8 + 1 + 1 + 2 + 1
+
+EMPTY_DEPTH = -128
+
+
+def pack_move(move):
+    """
+    Packs a move into 16 bits: from | to << 6 | promotion << 12.
+    0 means "no move" (a1a1 is never legal, the null move packs to it too).
+    """
+    if move is None:
+        return 0
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def unpack_move(packed):
+    if not packed:
+        return None
+    return chess.Move(packed & 63, (packed >> 6) & 63, (packed >> 12) or None)
+
+
+class TranspositionTable:
+    """
+    Fixed-size transposition table stored as parallel typed arrays.
+
+    Entries live in buckets of two slots: the first is depth-preferred (only
+    replaced by a deeper result or when it is left over from an older search),
+    the second is always replaced.
+    """
+
+    def __init__(self, size_mb=16):
+        self.size_mb = size_mb
+
+        entries = max(2, int(size_mb * 1024 * 1024) // ENTRY_BYTES)
+        self.size = 1 << (entries.bit_length() - 1)
+        self.mask = (self.size >> 1) - 1
+
+        self.age = 0
+        self.allocate()
+
+    def allocate(self):
+        n = self.size
+        self.keys = array.array("Q", bytes(8 * n))
+        self.scores = array.array("d", bytes(8 * n))
+        self.depths = array.array("b", [EMPTY_DEPTH]) * n
+        self.bounds = array.array("B", bytes(n))
+        self.moves = array.array("H", bytes(2 * n))
+        self.ages = array.array("B", bytes(n))
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def clear(self):
+        self.age = 0
+        self.allocate()
+
+    def new_game(self):
+        """Call between games: forgets everything."""
+        self.clear()
+
+    def flush(self):
+        pass
+
+    def worker_copy(self):
+        """The table a parallel-search worker process should use."""
+        return self
+
+    def new_search(self):
+        """Call once per root search so stale entries become replaceable."""
+        self.age = (self.age + 1) & 0xFF
+
+    def probe(self, key):
+        """Returns (score, depth, bound, packed_move) or None."""
+        self.probes += 1
+        i = (key & self.mask) << 1
+        keys = self.keys
+        if keys[i] != key:
+            i += 1
+            if keys[i] != key:
+                if self.depths[i - 1] != EMPTY_DEPTH:
+                    self.collisions += 1
+                return None
+        self.hits += 1
+        return self.scores[i], self.depths[i], self.bounds[i], self.moves[i]
+
+    def store(self, key, depth, bound, score, move=0):
+        self.stores += 1
+        i = (key & self.mask) << 1
+        keys = self.keys
+        if keys[i] != key:
+            if keys[i + 1] == key or (depth < self.depths[i] and self.ages[i] == self.age):
+                i += 1
+
+        # keep the old best move when the new result didn't produce one
+        if not move and keys[i] == key:
+            move = self.moves[i]
+
+        keys[i] = key
+        self.scores[i] = score
+        self.depths[i] = max(EMPTY_DEPTH + 1, min(127, depth))
+        self.bounds[i] = bound
+        self.moves[i] = move
+        self.ages[i] = self.age
+
+    def best_move(self, key):
+        """Packed best move stored for this position, or 0."""
+        i = (key & self.mask) << 1
+        if self.keys[i] == key:
+            return self.moves[i]
+        if self.keys[i + 1] == key:
+            return self.moves[i + 1]
+        return 0
+
+    def hashfull(self):
+        """Permille of the first 1000 slots in use by the current search."""
+        sample = min(1000, self.size)
+        used = sum(1 for i in range(sample) if self.depths[i] != EMPTY_DEPTH and self.ages[i] == self.age)
+        return used * 1000 // sample
+
+    def stats(self):
+        return {
+            "probes": self.probes,
+            "hits": self.hits,
+            "collisions": self.collisions,
+            "stores": self.stores,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+        }
+
+
+# On-disk table file: a header, then the arrays back to back (8-byte ones first
+# so every array stays aligned).
+MAGIC = b"CHTT"
+# 2: bitbase scores stored relative to their node (see ChessBotBase.score_to_tt)
+FILE_VERSION = 2
+# magic, file version, age, table size, bot name, eval version
+HEADER = struct.Struct("<4sHBxQ64s64s")
+HEADER_BYTES = 256
+
+
+class PersistentTranspositionTable(TranspositionTable):
+    """
+    TranspositionTable kept in a memory-mapped file so results survive
+    between games and processes. The header names the bot and its eval
+    version (see Bot.tt_version); a file written for anything else is
+    started over rather than reused. The table size comes from the file
+    when it already exists, from size_mb when it is created.
+
+    new_game() keeps the entries (flushing them to disk) instead of
+    clearing them. With readonly=True the file is mapped copy-on-write:
+    the search can still store into it, but nothing reaches the disk, so
+    any number of processes can share one file this way (workers of a
+    parallel search always do).
+    """
+
+    def __init__(self, path, size_mb=16, name="", version="", readonly=False):
+        self.path = os.fspath(path)
+        self.name = name
+        self.version = version
+        self.readonly = readonly
+        self.file = None
+        self.map = None
+        self.views = []
+        super().__init__(size_mb)
+        atexit.register(self.close)
+
+    def __getstate__(self):
+        # worker processes open the same file read-only
+        return {"path": self.path, "size_mb": self.size_mb, "name": self.name, "version": self.version}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["size_mb"], state["name"], state["version"], readonly=True)
+
+    def header(self):
+        return HEADER.pack(MAGIC, FILE_VERSION, self.age, self.size,
+                           self.name.encode()[:64], self.version.encode()[:64])
+
+    def read_header(self):
+        """The table size recorded in the file, or None if it can't be reused."""
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read(HEADER_BYTES)
+                f.seek(0, os.SEEK_END)
+                length = f.tell()
+        except FileNotFoundError:
+            return None
+        if len(data) < HEADER.size:
+            return None
+        magic, file_version, age, size, name, version = HEADER.unpack_from(data)
+        if (magic != MAGIC or file_version != FILE_VERSION or name.rstrip(b"\0") != self.name.encode()[:64]
+                or version.rstrip(b"\0") != self.version.encode()[:64]
+                or size < 2 or size & (size - 1) or length != HEADER_BYTES + size * ENTRY_BYTES):
+            return None
+        self.age = age
+        return size
+
+    def allocate(self):
+        self.close()
+        size = self.read_header()
+        fresh = size is None
+        if fresh:
+            if self.readonly:
+                # nothing usable on disk: an ordinary in-memory table
+                super().allocate()
+                return
+            self.age = 0
+            with open(self.path, "wb") as f:
+                f.truncate(HEADER_BYTES + self.size * ENTRY_BYTES)
+        else:
+            self.size = size
+            self.mask = (size >> 1) - 1
+
+        self.file = open(self.path, "rb" if self.readonly else "r+b")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_COPY if self.readonly else mmap.ACCESS_WRITE)
+        n = self.size
+        view = memoryview(self.map)
+        offset = HEADER_BYTES
+        for name, fmt, width in (("keys", "Q", 8), ("scores", "d", 8), ("moves", "H", 2),
+                                 ("depths", "b", 1), ("bounds", "B", 1), ("ages", "B", 1)):
+            array_view = view[offset:offset + n * width].cast(fmt)
+            self.views.append(array_view)
+            setattr(self, name, array_view)
+            offset += n * width
+        self.views.append(view)
+
+        if fresh:
+            self.depths[:] = array.array("b", [EMPTY_DEPTH]) * n
+            self.map[:HEADER_BYTES] = self.header().ljust(HEADER_BYTES, b"\0")
+        self.reset_counters()
+
+    def clear(self):
+        """Empties the table, on disk too unless read-only."""
+        if self.map is not None:
+            n = self.size
+            self.keys[:] = array.array("Q", bytes(8 * n))
+            self.depths[:] = array.array("b", [EMPTY_DEPTH]) * n
+            self.moves[:] = array.array("H", bytes(2 * n))
+            self.age = 0
+            self.reset_counters()
+            self.flush()
+        else:
+            super().clear()
+
+    def new_game(self):
+        self.new_search()
+        self.flush()
+
+    def worker_copy(self):
+        # a forked worker would otherwise share the writable mapping with this process
+        if self.readonly:
+            return self
+        return PersistentTranspositionTable(self.path, self.size_mb, self.name, self.version, readonly=True)
+
+    def flush(self):
+        if self.map is not None and not self.readonly:
+            self.map[:HEADER_BYTES] = self.header().ljust(HEADER_BYTES, b"\0")
+            self.map.flush()
+
+    def close(self):
+        """Flushes and unmaps the file (the table is unusable afterwards)."""
+        if self.map is not None:
+            self.flush()
+            for view in self.views:
+                view.release()
+            self.views = []
+            self.map.close()
+            self.file.close()
+            self.map = None
+            self.file = None
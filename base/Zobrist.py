@@ -0,0 +1,129 @@
+import chess
+import chess.polyglot
+
+# Incremental polyglot hashing. Keys produced here are identical to
+# chess.polyglot.zobrist_hash, so books and tables built from either agree.
+
+RANDOM = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+
+# PIECE_KEYS[color][piece_type][square], index 0 of piece_type is unused
+PIECE_KEYS = [
+    [[0] * 64] + [[RANDOM[64 * ((piece_type - 1) * 2 + color) + square] for square in chess.SQUARES]
+                  for piece_type in chess.PIECE_TYPES]
+    for color in (chess.BLACK, chess.WHITE)
+]
+
+TURN_KEY = RANDOM[780]
+EP_KEYS = [RANDOM[772 + file] for file in range(8)]
+
+CASTLING_SQUARES = chess.BB_H1 | chess.BB_A1 | chess.BB_H8 | chess.BB_A8
+
+def _castling_key(rights):
+    key = 0
+    if rights & chess.BB_H1:
+        key ^= RANDOM[768]
+    if rights & chess.BB_A1:
+        key ^= RANDOM[769]
+    if rights & chess.BB_H8:
+        key ^= RANDOM[770]
+    if rights & chess.BB_A8:
+        key ^= RANDOM[771]
+    return key
+
+CASTLING_KEYS = {}
+
+def castling_key(rights):
+    """Castling part of the key for a (clean, standard chess) castling mask."""
+    rights &= CASTLING_SQUARES
+    key = CASTLING_KEYS.get(rights)
+    if key is None:
+        key = CASTLING_KEYS[rights] = _castling_key(rights)
+    return key
+
+
+def ep_key(board):
+    """
+    En passant part of the key. Like polyglot, the file only counts when a
+    pawn of the side to move stands ready to capture.
+    """
+    ep_square = board.ep_square
+    if ep_square is None:
+        return 0
+    if board.turn == chess.WHITE:
+        mask = chess.BB_SQUARES[ep_square - 8]
+    else:
+        mask = chess.BB_SQUARES[ep_square + 8]
+    mask = ((mask << 1) & ~chess.BB_FILE_A) | ((mask >> 1) & ~chess.BB_FILE_H)
+    if mask & board.pawns & board.occupied_co[board.turn]:
+        return EP_KEYS[ep_square & 7]
+    return 0
+
+
+def piece_delta(board, move):
+    """
+    XOR of the piece-square keys a move toggles. Must be called on the board
+    *before* the move is pushed.
+    """
+    from_square = move.from_square
+    to_square = move.to_square
+    color = board.turn
+    keys = PIECE_KEYS[color]
+    piece_type = board.piece_type_at(from_square)
+
+    if piece_type == chess.KING:
+        to_bb = chess.BB_SQUARES[to_square]
+        if board.rooks & board.occupied_co[color] & to_bb:
+            # king-takes-own-rook castling encoding
+            rook_from = to_square
+        elif abs(to_square - from_square) == 2:
+            rook_from = from_square + 3 if to_square > from_square else from_square - 4
+        else:
+            rook_from = None
+
+        if rook_from is not None:
+            rank = from_square & ~7
+            if rook_from > from_square:
+                king_to, rook_to = rank + 6, rank + 5
+            else:
+                king_to, rook_to = rank + 2, rank + 3
+            return (keys[chess.KING][from_square] ^ keys[chess.KING][king_to] ^
+                    keys[chess.ROOK][rook_from] ^ keys[chess.ROOK][rook_to])
+
+    delta = keys[piece_type][from_square] ^ keys[move.promotion or piece_type][to_square]
+
+    captured = board.piece_type_at(to_square)
+    if captured:
+        delta ^= PIECE_KEYS[not color][captured][to_square]
+    elif piece_type == chess.PAWN and to_square == board.ep_square and (to_square - from_square) & 7:
+        captured_square = to_square - 8 if color == chess.WHITE else to_square + 8
+        delta ^= PIECE_KEYS[not color][chess.PAWN][captured_square]
+
+    return delta
+
+
+def is_clean(board):
+    """
+    Whether incremental castling keys can be trusted for this board, i.e. its
+    raw castling mask is already what polyglot hashes.
+    """
+    return board.castling_rights & CASTLING_SQUARES == board.clean_castling_rights() and not board.chess960
+
+
+def board_key(board):
+    """chess.polyglot.zobrist_hash(board), computed from the bitboards (standard chess)."""
+    if not is_clean(board):
+        return chess.polyglot.zobrist_hash(board)
+    key = 0
+    for color in (chess.BLACK, chess.WHITE):
+        keys = PIECE_KEYS[color]
+        mask = board.occupied_co[color]
+        for piece_type, pieces in ((chess.PAWN, board.pawns), (chess.KNIGHT, board.knights),
+                                   (chess.BISHOP, board.bishops), (chess.ROOK, board.rooks),
+                                   (chess.QUEEN, board.queens), (chess.KING, board.kings)):
+            square_keys = keys[piece_type]
+            for square in chess.scan_forward(pieces & mask):
+                key ^= square_keys[square]
+    key ^= castling_key(board.castling_rights) ^ ep_key(board)
+    if board.turn == chess.WHITE:
+        key ^= TURN_KEY
+    return key
@@ -0,0 +1,208 @@
+import argparse
+import importlib
+import json
+import pkgutil
+import random
+import sys
+import time
+
+import chess
+
+import bots
+
+# Headless search benchmark. Every bot in bots/ searches the same positions
+# to a fixed depth with a fixed random seed and no opening book, so the
+# node counts are exactly repeatable: the total over all positions (the
+# signature) only moves when the search or an evaluation changes, while
+# NPS tracks speed.
+#
+#     python bench.py                         # all bots, depths 1-3
+#     python bench.py --bots alephNull --depth 4
+#     python bench.py --save bench.json       # write a baseline
+#     python bench.py --compare bench.json    # exit 1 on a signature change or slowdown
+#     python bench.py --check                 # also check cached evaluations against fresh ones
+#
+# Short runs give noisy NPS: use --repeat to time each search several times
+# (the fastest counts), and runs under MIN_TIME seconds are never reported
+# as slower or faster.
+
+POSITIONS = [
+    ("start", chess.STARTING_FEN),
+    ("italian", "r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"),
+    ("qgd", "r1bq1rk1/pp2bppp/2n1pn2/2pp4/2PP4/2N1PN2/PP2BPPP/R1BQ1RK1 w - - 0 8"),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"),
+    ("wac2", "8/7p/5k2/5p2/p1p2P2/Pr1pPK2/1P1R3P/6R1 b - - 0 1"),
+    ("wac3", "5rk1/1ppb3p/p1pb4/6q1/3P1p1r/2P1R2P/PP1BQ1P1/5RKN w - - 0 1"),
+    ("rook ending", "8/5pk1/6p1/8/3R4/6PP/5PK1/r7 w - - 0 1"),
+    ("pawn ending", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"),
+]
+
+DEPTHS = [1, 2, 3]
+SEED = 1
+TOLERANCE = 0.10    # NPS drop (as a fraction) reported as a slowdown
+MIN_TIME = 0.5      # seconds a bot/depth must take before its NPS is compared
+
+# two ways to the position after 1.Nf3 Nf6: directly, and as its third occurrence
+FRESH_LINE = ["g1f3", "g8f6"]
+REPETITION_LINE = ["g1f3", "g8f6", "f3g1", "f6g8"] * 2 + FRESH_LINE
+
+
+def bot_modules():
+    """Module names of every bot in bots/."""
+    return sorted(info.name for info in pkgutil.iter_modules(bots.__path__))
+
+
+def search(module, fen, depth, seed):
+    """One fixed-depth search from a fresh bot. Returns (move, nodes, seconds)."""
+    board = chess.Board(fen)
+    bot = importlib.import_module(f"bots.{module}").Bot(color=board.turn, depth=depth)
+    # the bench measures the search, not the book
+    bot.opening = lambda board: None
+
+    random.seed(seed)
+    start = time.perf_counter()
+    move = bot.start_search(board, {"depth": depth}).result()
+    seconds = time.perf_counter() - start
+    bot.close()
+    return move, bot.last_search_info.nodes, seconds
+
+
+def run(modules, depths, seed=SEED, positions=POSITIONS, repeat=1, verbose=True):
+    """{module: {depth: result}}, where each result holds the totals and a per-position breakdown."""
+    results = {}
+    for module in modules:
+        results[module] = {}
+        for depth in depths:
+            per_position = {}
+            for name, fen in positions:
+                move, nodes, seconds = search(module, fen, depth, seed)
+                for _ in range(repeat - 1):
+                    seconds = min(seconds, search(module, fen, depth, seed)[2])
+                per_position[name] = {"move": move.uci() if move else None, "nodes": nodes, "time": seconds}
+
+            nodes = sum(p["nodes"] for p in per_position.values())
+            seconds = sum(p["time"] for p in per_position.values())
+            result = {
+                "signature": nodes,
+                "time": seconds,
+                "nps": nodes / seconds if seconds else 0.0,
+                "positions": per_position,
+            }
+            results[module][str(depth)] = result
+            if verbose:
+                print(f"{module:22} depth {depth}  signature {nodes:>9}  {seconds:7.2f}s  {result['nps']:>8.0f} nps")
+    return results
+
+
+def check_eval_cache(module):
+    """
+    Evaluates one position reached by REPETITION_LINE and then by
+    FRESH_LINE, through main_eval and so the bot's eval cache. Returns
+    (cached, expected): the second score and that of a new bot, which must
+    agree whatever the first path left in the cache.
+    """
+    bot_class = importlib.import_module(f"bots.{module}").Bot
+    bot = bot_class(color=chess.WHITE)
+    repeated = chess.Board()
+    for uci in REPETITION_LINE:
+        repeated.push_uci(uci)
+    bot.begin_search(repeated)
+    bot.main_eval(repeated)
+
+    fresh = chess.Board()
+    for uci in FRESH_LINE:
+        fresh.push_uci(uci)
+    bot.begin_search(fresh)
+    cached = bot.main_eval(fresh)
+
+    reference = bot_class(color=chess.WHITE)
+    reference.begin_search(fresh)
+    expected = reference.main_eval(fresh)
+    bot.close()
+    reference.close()
+    return cached, expected
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    Differences from a baseline as printable lines, plus whether any of
+    them is a regression (changed signature or an NPS drop past `tolerance`).
+    """
+    lines = []
+    regressed = False
+    for module, by_depth in results.items():
+        for depth, result in by_depth.items():
+            old = baseline.get(module, {}).get(depth)
+            if old is None:
+                lines.append(f"{module} depth {depth}: not in baseline")
+                continue
+
+            label = f"{module} depth {depth}"
+            if result["signature"] != old["signature"]:
+                regressed = True
+                lines.append(f"{label}: SEARCH CHANGED, signature {old['signature']} -> {result['signature']}")
+                for name, position in result["positions"].items():
+                    before = old["positions"].get(name)
+                    if before is not None and (before["nodes"], before["move"]) != (position["nodes"], position["move"]):
+                        lines.append(f"    {name}: {before['move']} {before['nodes']} -> "
+                                     f"{position['move']} {position['nodes']}")
+
+            if min(result["time"], old["time"]) < MIN_TIME:
+                continue
+            ratio = result["nps"] / old["nps"] if old["nps"] else 1.0
+            if ratio < 1 - tolerance:
+                regressed = True
+                lines.append(f"{label}: SLOWER, {old['nps']:.0f} -> {result['nps']:.0f} nps ({ratio - 1:+.0%})")
+            elif ratio > 1 + tolerance:
+                lines.append(f"{label}: faster, {old['nps']:.0f} -> {result['nps']:.0f} nps ({ratio - 1:+.0%})")
+    return lines, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fixed-depth search benchmark over the bundled bots.")
+    parser.add_argument("--bots", nargs="+", default=None, help="bot modules to run (default: all in bots/)")
+    parser.add_argument("--depth", nargs="+", type=int, default=DEPTHS, help="search depths")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--repeat", type=int, default=1, help="time each search this many times, keep the fastest")
+    parser.add_argument("--save", metavar="FILE", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare against a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed NPS drop when comparing")
+    parser.add_argument("--check", action="store_true",
+                        help="check that cached evaluations don't depend on the path to a position")
+    args = parser.parse_args(argv)
+
+    modules = args.bots or bot_modules()
+    if args.check:
+        failed = False
+        for module in modules:
+            cached, expected = check_eval_cache(module)
+            if cached != expected:
+                failed = True
+                print(f"{module}: EVAL CACHE MISMATCH, {cached} after a repetition path, {expected} fresh")
+        if failed:
+            return 1
+    results = run(modules, args.depth, args.seed, repeat=args.repeat)
+
+    total_nodes = sum(r["signature"] for by_depth in results.values() for r in by_depth.values())
+    total_time = sum(r["time"] for by_depth in results.values() for r in by_depth.values())
+    print(f"\ntotal: {total_nodes} nodes, {total_time:.2f}s, "
+          f"{total_nodes / total_time if total_time else 0:.0f} nps")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"seed": args.seed, "results": results}, f, indent=2)
+        print(f"baseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("seed") != args.seed:
+            print(f"warning: baseline was run with seed {baseline.get('seed')}")
+        lines, regressed = compare(results, baseline["results"], args.tolerance)
+        print("\n".join(lines) if lines else "no differences from the baseline")
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
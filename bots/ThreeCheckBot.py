@@ -3,6 +3,11 @@ import chess
 import math
 
 class Bot(Bot):
+    counts_checks = True
+    eval_uses_history = False
+    # the check counters change along the search path
+    cache_evals = False
+
     def name(self):
         return "3Check Bot"
 
@@ -1,6 +1,7 @@
 import chess
-import random
 import base.ChessBotBase as ChessBotBase
+from base.OpeningBook import OpeningBook
+import base.Accumulator as Accumulator
 import math
 
 
@@ -194,56 +195,28 @@ def bound(x):
     return max(min(x,1),0)
 
 class Bot(ChessBotBase.Bot):
+    pawn_value = 1
     pieces = []
     values = {chess.PAWN: PAWN, chess.KNIGHT: KNIGHT, chess.BISHOP: BISHOP, chess.ROOK: ROOK, chess.QUEEN: QUEEN}
 
+    # material and PST totals are kept up to date by the search (see self.accumulated)
+    material_values = values
+    pst_tables = {
+        chess.PAWN:   PAWN_TABLE,
+        chess.KNIGHT: KNIGHT_TABLE,
+        chess.BISHOP: BISHOP_TABLE,
+        chess.ROOK:   ROOK_TABLE,
+        chess.QUEEN:  QUEEN_TABLE,
+        chess.KING:   KING_TABLE,
+    }
+    books = [OpeningBook("books/alephNull.bin")]
+
     def name(self):
         return "Aleph Null"
 
     def image(self):
         return "icons/AlephNullIcon.png"
 
-    def opening(self, board):
-        fen = str(board.fen().split(" ")[0])
-        move = None
-        if self.turn > 1:
-            return None
-        if fen == "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR": #empty
-            move = "e2e4"
-        elif fen == "rnbqkbnr/pppppppp/8/8/3P4/8/PPP1PPPP/RNBQKBNR": #d4
-            move = "d7d5"
-        elif fen == "rnbqkbnr/pppppppp/8/8/8/5N2/PPPPPPPP/RNBQKB1R": #Nf3
-            move = "c7c5"
-        elif fen == "rnbqkbnr/pppppppp/8/8/8/2N5/PPPPPPPP/R1BQKBNR": #Nc3
-            move = "d7d5"
-        elif fen == "rnbqkbnr/pppppppp/8/8/5P2/8/PPPPP1PP/RNBQKBNR": #f4
-            move = "g8f6"
-        elif self.turn == 0 and self.color == chess.BLACK:
-            move = "e7e5"
-
-        ################### WHTIE RESPONSES ###################
-
-        elif fen == "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR": # e4 e5 Normal Variation
-            move = "g1f3"
-        elif fen == "rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR": # e4 d5 Scandinavian
-            move = "e4d5"
-        elif fen == "rnbqkb1r/pppppppp/5n2/8/4P3/8/PPPP1PPP/RNBQKBNR": # e4 Nf6 Alekhine 
-            move = "e4e5"
-        elif fen == "rnbqkbnr/pppppp1p/8/6p1/4P3/8/PPPP1PPP/RNBQKBNR": # e4 g5 Borg
-            move = "b1c3"
-        elif fen == "rnbqkbnr/ppppp1pp/8/5p2/4P3/8/PPPP1PPP/RNBQKBNR": # e4 f5 Duras Gambit
-            move = "e4f5"
-        elif fen == "r1bqkbnr/pppppppp/n7/8/4P3/8/PPPP1PPP/RNBQKBNR": # e4 Na6 Lemming
-            move = "g1f3"
-        elif fen == "rnbqkbnr/p1pppppp/8/1p6/4P3/8/PPPP1PPP/RNBQKBNR": # e4 b5 ?!
-            move = "f1b5"
-        elif self.turn == 1 and self.color == chess.WHITE:
-            move = "d2d4"
-
-        if move == None:
-            return None
-        return chess.Move.from_uci(move)
-
     def get_pieces(self, board):
         pieces = []
 
@@ -330,9 +303,14 @@ class Bot(ChessBotBase.Bot):
                     elif piece == chess.QUEEN:
                         self.op_queens_dev.append(square)
         
-    def evaluate(self, board: chess.Board):
+    def evaluate_batch(self, boards):
+        # material and PST for every leaf in one vectorised pass, the rest board by board
+        return [self.evaluate(board, totals) for board, totals in zip(boards, self.accumulated_batch(boards))]
+
+    def evaluate(self, board: chess.Board, totals=None):
 
         score = 0
+        lap = self.profiler.laps()
 
         ################### SETUP ###################
 
@@ -343,9 +321,12 @@ class Bot(ChessBotBase.Bot):
                 return -math.inf
             else:
                 return math.inf
+        lap("checkmate")
 
         self.get_pieces(board)
+        lap("pieces")
         self.get_developed(board)
+        lap("developed squares")
 
         p = len(self.pieces) / 15
 
@@ -360,30 +341,17 @@ class Bot(ChessBotBase.Bot):
             score += MOD_LIST[3] * END
             return score
         
-        def pst_lookup(table, square, color):
-            if color == chess.WHITE:
-                idx = square
-            else:
-                rank = chess.square_rank(square)
-                file = chess.square_file(square)
-                idx = (7 - rank) * 8 + file
-            return table[0][idx] + table[1][idx] * BEGINNING + table[2][idx] * MIDDLE + table[3][idx] * END
+        phase = [1, BEGINNING, MIDDLE, END]
+        if totals is None:
+            totals = self.accumulated(board)
 
         ################### MATERIAL ###################
 
-        material = len(self.pawns) * mod_list(PAWN)
-        material += len(self.knights) * mod_list(KNIGHT)
-        material += len(self.bishops) * mod_list(BISHOP)
-        material += len(self.rooks) * mod_list(ROOK)
-        material += len(self.queens) * mod_list(QUEEN)
-
-        op_material = len(self.op_pawns) * mod_list(PAWN)
-        op_material += len(self.op_knights) * mod_list(KNIGHT)
-        op_material += len(self.op_bishops) * mod_list(BISHOP)
-        op_material += len(self.op_rooks) * mod_list(ROOK)
-        op_material += len(self.op_queens) * mod_list(QUEEN)
+        material = Accumulator.blend(Accumulator.material(totals, self.color), phase)
+        op_material = Accumulator.blend(Accumulator.material(totals, not self.color), phase)
 
         simplification = (material + epsilon) / (op_material + epsilon)
+        lap("material")
         
         ################### DEVELOPMENT ###################
         
@@ -398,6 +366,7 @@ class Bot(ChessBotBase.Bot):
         op_development += len(self.op_bishops_dev) * mod_list(BISHOP_DEVELOPMENT_MOD)
         op_development += len(self.op_rooks_dev) * mod_list(ROOK_DEVELOPMENT_MOD)
         op_development += len(self.op_queens_dev) * mod_list(QUEEN_DEVELOPMENT_MOD)
+        lap("development")
 
         ################### ATTACKS / DEFENCE ###################
 
@@ -435,6 +404,7 @@ class Bot(ChessBotBase.Bot):
                     op_defended.append(piece)
                 if piece.color == self.color:
                     op_attacked.append(piece)
+        lap("attacks/defence")
             
 
         ################### CASTLE ###################
@@ -447,23 +417,9 @@ class Bot(ChessBotBase.Bot):
 
         ################### PST ###################
 
-        pst_map = {
-            chess.PAWN:   PAWN_TABLE,
-            chess.KNIGHT: KNIGHT_TABLE,
-            chess.BISHOP: BISHOP_TABLE,
-            chess.ROOK:   ROOK_TABLE,
-            chess.QUEEN:  QUEEN_TABLE,
-            chess.KING:   KING_TABLE,
-        }
-
-        pst_score = 0
-        op_pst_score = 0
-
-        for piece_type, table in pst_map.items():
-            for square in board.pieces(piece_type, self.color):
-                pst_score += pst_lookup(table, square, self.color)
-            for square in board.pieces(piece_type, not self.color):
-                op_pst_score += pst_lookup(table, square, not self.color)
+        pst_score = Accumulator.blend(Accumulator.pst(totals, self.color), phase)
+        op_pst_score = Accumulator.blend(Accumulator.pst(totals, not self.color), phase)
+        lap("castle/pst")
 
         ################### EVALUATION ###################
 
@@ -497,12 +453,14 @@ class Bot(ChessBotBase.Bot):
             score *= mod_list(TEMPO_MOD)
         else:
             score /= mod_list(TEMPO_MOD)
+        lap("scoring")
 
         
         if board.is_game_over() and not board.is_checkmate():
             score /= -8
         elif board.is_repetition(2):
             score /= -8
+        lap("draws")
 
         return score
     
\ No newline at end of file
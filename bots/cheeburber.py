@@ -11,9 +11,13 @@ class Bot(BaseBot.Bot):
     Your specialized bot that uses the base search logic but with your
     original evaluation function (sped up + slightly tuned).
     """
-    def __init__(self, color=chess.WHITE, depth=4):
-        # Pass params to base — note: base defaults to BLACK & depth=2
-        super().__init__(color=color, depth=depth, qsearch=False, qdepth=4)
+    pawn_value = 100
+    eval_uses_history = False
+
+    def __init__(self, color=chess.WHITE, depth=4, qsearch=False, qdepth=4, **kwargs):
+        # Pass params to base — note: base defaults to BLACK & depth=2;
+        # the other base flags (null_move, lmr, workers, ...) go through kwargs
+        super().__init__(color=color, depth=depth, qsearch=qsearch, qdepth=qdepth, **kwargs)
         # You can keep qsearch=False since we're not using quiescence
 
         # Precompute constants for faster eval
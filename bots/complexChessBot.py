@@ -1,48 +1,22 @@
 import chess
-import random
 import base.ChessBotBase as ChessBotBase
+from base.OpeningBook import OpeningBook
 import math
 
 class Bot(ChessBotBase.Bot):
+    pawn_value = 1
+    eval_uses_history = False
+    books = [OpeningBook("books/complexChessBot.bin")]
+
     def name(self):
         return "Complex Chess Bot"
 
-    def opening(self, board):
-        fen = str(board.fen().split(" ")[0])
-        move = None
-        if self.turn > 1:
-            return None
-        if fen == "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR": #empty
-            move = ["e2e4", "d2d4", "c2c4", "g1f3", "b1c3"][random.randint(0, 4)]
-        elif fen == "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR": #e4
-            move = "e7e5"
-        elif fen == "rnbqkbnr/pppppppp/8/8/8/4P3/PPPP1PPP/RNBQKBNR": #e3
-            move = "e7e5"
-        elif fen == "rnbqkbnr/pppppppp/8/8/3P4/8/PPP1PPPP/RNBQKBNR": #d4
-            move = "d7d5"
-        elif fen == "rnbqkbnr/pppppppp/8/8/8/5N2/PPPPPPPP/RNBQKB1R": #Nf3
-            move = "c7c5"
-        elif fen == "rnbqkbnr/pppppppp/8/8/8/2N5/PPPPPPPP/R1BQKBNR": #Nc3
-            move = "d7d5"
-        elif fen == "rnbqkbnr/pppppppp/8/8/8/3P4/PPP1PPPP/RNBQKBNR": #d3
-            move = "e7e5"
-        elif fen == "rnbqkbnr/pppppppp/8/8/5P2/8/PPPPP1PP/RNBQKBNR": #f4
-            move = "g8f6"
-        elif fen == "rnbqkbnr/pppppppp/8/8/2P5/8/PP1PPPPP/RNBQKBNR": #c4
-            move = "e7e5"
-        elif fen == "rnbqkbnr/pppppppp/8/8/8/1P6/P1PPPPPP/RNBQKBNR": #b3
-            move = "e7e5"
-        elif self.turn == 1:
-            move = "e7e5"
-        if move == None:
-            return None
-        return chess.Move.from_uci(move)
-            
-
     def evaluate(self, board):
+        lap = self.profiler.laps()
 
         if board.is_checkmate():
             return -math.inf if board.turn == self.color else math.inf
+        lap("checkmate")
         
         score = 0
 
@@ -92,6 +66,7 @@ class Bot(ChessBotBase.Bot):
         )
 
         material_score = (my_material - opponent_material) / middlegame_bonus + (my_material / opponent_material)
+        lap("material")
 
         # ---------------- ATTACKERS/DEFENDERS -----------------
 
@@ -127,6 +102,7 @@ class Bot(ChessBotBase.Bot):
         for target_square in queen_squares:
             defended_score += len(board.attackers(self.color, target_square)) * queen_val * defend_mod
             attacked_score += len(board.attackers(not self.color, target_square)) * queen_val * attacked_mod
+        lap("attackers/defenders")
 
         # ---------------- ATTACKING -----------------
 
@@ -156,6 +132,7 @@ class Bot(ChessBotBase.Bot):
 
         for target_square in opp_queen_squares:
             attacker_score += len(board.attackers(self.color, target_square)) * queen_val * attack_mod
+        lap("attacking")
 
         
 
@@ -181,6 +158,7 @@ class Bot(ChessBotBase.Bot):
         central_control -= len(board.attackers(not self.color, chess.D5)) * opp_center_control_mod
 
         central_control *= beginning_bonus
+        lap("central control")
 
         # ------------------ KING WALKING -------------------
 
@@ -192,6 +170,7 @@ class Bot(ChessBotBase.Bot):
             king_walk_score += 8 - chess.square_rank(king_squares[0])
 
         king_walk_score *= king_walk_mod * ((endgame_bonus ** 2) - (beginning_bonus ** 2) - 1)
+        lap("king walking")
         
 
         # ----------------- CHECKMATING --------------------
@@ -206,6 +185,7 @@ class Bot(ChessBotBase.Bot):
         opp_king_score = opp_king_dist * opp_king_dist_mod * max(0, endgame_bonus - 1.7)
 
         king_dists_score = king_dists * distance_of_kings_mod * max(0, endgame_bonus - 1.7)
+        lap("checkmating")
 
         # ---------------- PAWN STRUCTURE ------------------
 
@@ -218,6 +198,7 @@ class Bot(ChessBotBase.Bot):
                 pawn_distance += 8 - chess.square_rank(pawn)
 
         pawn_distance_score = pawn_distance * pawn_distance_mod * beginning_bonus
+        lap("pawn structure")
 
         # -------------------- MOVEMENT ------------------------
 
@@ -228,6 +209,7 @@ class Bot(ChessBotBase.Bot):
                 attack_squares |= set(board.attacks(sq))
 
         coverage_score = len(attack_squares) * coverage_mod * middlegame_bonus * beginning_bonus
+        lap("movement")
 
         # ----------------------- SCORING ------------------------
 
@@ -240,7 +222,8 @@ class Bot(ChessBotBase.Bot):
         score += central_control
 
         if board.is_stalemate() or board.is_insufficient_material():
-            return -score / 8
+            score = -score / 8
+        lap("scoring")
 
         return score
 
@@ -1,9 +1,15 @@
 from base.ChessBotBase import Bot
 import chess
-import random
 import math
+from base.OpeningBook import OpeningBook
 
 class Bot(Bot):
+    pawn_value = 100
+    # the score follows self.turn's pride cycle and the last move played
+    cache_evals = False
+    # same repertoire as Complex Chess Bot
+    books = [OpeningBook("books/complexChessBot.bin")]
+
     def name(self):
         return "Escanor, The Lion's Sin of Pride"
     def count_captures_on_moved_piece(self, board):
@@ -129,36 +135,6 @@ class Bot(Bot):
                     total_penalty -= penalty
 
         return total_penalty
-    def openning(self, board):
-            fen = str(board.fen().split(" ")[0])
-            move = None
-            if self.turn > 1:
-                return None
-            if fen == "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR": #empty
-                move = ["e2e4", "d2d4", "c2c4", "g1f3", "b1c3"][random.randint(0, 4)]
-            elif fen == "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR": #e4
-                move = "e7e5"
-            elif fen == "rnbqkbnr/pppppppp/8/8/8/4P3/PPPP1PPP/RNBQKBNR": #e3
-                move = "e7e5"
-            elif fen == "rnbqkbnr/pppppppp/8/8/3P4/8/PPP1PPPP/RNBQKBNR": #d4
-                move = "d7d5"
-            elif fen == "rnbqkbnr/pppppppp/8/8/8/5N2/PPPPPPPP/RNBQKB1R": #Nf3
-                move = "c7c5"
-            elif fen == "rnbqkbnr/pppppppp/8/8/8/2N5/PPPPPPPP/R1BQKBNR": #Nc3
-                move = "d7d5"
-            elif fen == "rnbqkbnr/pppppppp/8/8/8/3P4/PPP1PPPP/RNBQKBNR": #d3
-                move = "e7e5"
-            elif fen == "rnbqkbnr/pppppppp/8/8/5P2/8/PPPPP1PP/RNBQKBNR": #f4
-                move = "g8f6"
-            elif fen == "rnbqkbnr/pppppppp/8/8/2P5/8/PP1PPPPP/RNBQKBNR": #c4
-                move = "e7e5"
-            elif fen == "rnbqkbnr/pppppppp/8/8/8/1P6/P1PPPPPP/RNBQKBNR": #b3
-                move = "e7e5"
-            elif self.turn == 1:
-                move = "e7e5"
-            if move == None:
-                return None
-            return chess.Move.from_uci(move)
     def evaluate(self, board):
         # Checkmate / stalemate
         if board.is_checkmate():
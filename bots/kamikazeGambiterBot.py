@@ -2,6 +2,8 @@ from base.ChessBotBase import Bot as BotBase
 import chess
 
 class Bot(BotBase):
+    eval_uses_history = False
+
     def name(self):
         return "Kamikaze Gambiter Bot"
     
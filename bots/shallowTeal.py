@@ -2,6 +2,7 @@ import math
 import random
 import chess
 from base.ChessBotBase import Bot
+import base.SEE as SEE
 
 pawn_val, knight_val, bishop_val, rook_val, queen_val = 10, 30, 35, 55, 100 # starts at 421
 
@@ -80,26 +81,10 @@ class Bot(Bot):
 
         
 
-        for piece_type in chess.PIECE_TYPES:
+        for piece_type in (chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN):
             for trade_square in board.pieces(piece_type, self.color):
-                attackers_value = []
-                defenders_value = []
-                attackers = 0
-                defenders = 0
-                for attacker in board.attackers(not self.color, trade_square):
-                    attackers += 1
-                    attackers_value.append(self.getPieceValue(board.piece_at(attacker)))
-                for defender in board.attackers(self.color, trade_square):
-                    defenders += 1
-                    defenders_value.append(self.getPieceValue(board.piece_at(defender)))
-                trade_length = min(defenders + 1, attackers)
-                attackers_value.sort()
-                defenders_value.sort()
-                attackers_value = attackers_value[:(trade_length - 1)]
-                defenders_value = defenders_value[:(trade_length - 1)]
-                attackers_value = sum(attackers_value) * attack_multiplier
-                defenders_value = sum(defenders_value) * attack_multiplier
-                score += (attackers_value - defenders_value)
+                # material the opponent wins by trading off on this square
+                score -= SEE.exchange(board, trade_square, not self.color) * pawn_val * attack_multiplier
 
 
 
@@ -2,6 +2,8 @@ from base.ChessBotBase import Bot
 import chess
 
 class Bot(Bot):
+    eval_uses_history = False
+
     def name(self):
         return "Stalemate Bot"
 
@@ -0,0 +1,178 @@
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import chess
+
+from base.ChessBotBase import Bot
+from base.Position import Position, PERFT_POSITIONS
+
+# Perft (leaf counts of the full legal move tree) over the standard test
+# positions, as a correctness check and speed benchmark for the move
+# generation / make-unmake paths the search runs on:
+#
+#   python-chess   chess.Board legal_moves + push/pop
+#   bot            Bot.make_move/unmake_move on a chess.Board (incremental zobrist keys)
+#   bitboard       base.Position generate_legal_moves + push/pop
+#   bot-bitboard   Bot.make_move/unmake_move on a base.Position
+#
+#     python perft.py 4                              # every position and backend
+#     python perft.py 5 --position start --divide --workers 8
+#     python perft.py 3 --backend bot --check        # also verify keys against python-chess
+#
+# A new backend is a class with moves(), push(move) and pop() registered in BACKENDS.
+
+
+class BoardBackend:
+
+    def __init__(self, fen, check=False):
+        self.board = chess.Board(fen)
+
+    def moves(self):
+        return list(self.board.legal_moves)
+
+    def push(self, move):
+        self.board.push(move)
+
+    def pop(self):
+        self.board.pop()
+
+
+class PositionBackend:
+
+    def __init__(self, fen, check=False):
+        self.board = Position.from_board(chess.Board(fen))
+
+    def moves(self):
+        return self.board.generate_legal_moves()
+
+    def push(self, move):
+        self.board.push(move)
+
+    def pop(self):
+        self.board.pop()
+
+
+class BotBackend:
+    """The search's own make/unmake; with `check` every key is compared to a full zobrist hash."""
+    bitboard = False
+
+    def __init__(self, fen, check=False):
+        board = chess.Board(fen)
+        self.bot = Bot(debug_hash=check)
+        self.board = Position.from_board(board) if self.bitboard else board
+        self.bot.begin_search(self.board)
+
+    def moves(self):
+        if self.bitboard:
+            return self.board.generate_legal_moves()
+        return list(self.board.legal_moves)
+
+    def push(self, move):
+        self.bot.make_move(self.board, move)
+
+    def pop(self):
+        self.bot.unmake_move(self.board)
+
+
+class BotPositionBackend(BotBackend):
+    bitboard = True
+
+
+BACKENDS = {
+    "python-chess": BoardBackend,
+    "bot": BotBackend,
+    "bitboard": PositionBackend,
+    "bot-bitboard": BotPositionBackend,
+}
+
+
+def perft(backend, depth):
+    if depth == 0:
+        return 1
+    moves = backend.moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        backend.push(move)
+        nodes += perft(backend, depth - 1)
+        backend.pop()
+    return nodes
+
+
+def _divide_move(backend_name, fen, uci, depth, check):
+    backend = BACKENDS[backend_name](fen, check)
+    backend.push(chess.Move.from_uci(uci))
+    return perft(backend, depth - 1)
+
+
+def divide(backend_name, fen, depth, workers=0, check=False):
+    """[(move, nodes)] for every root move, split over `workers` processes if given."""
+    moves = [move.uci() for move in BACKENDS[backend_name](fen, check).moves()]
+    if depth < 1:
+        return []
+    args = [(backend_name, fen, uci, depth, check) for uci in moves]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            counts = list(executor.map(_divide_move, *zip(*args)))
+    else:
+        counts = [_divide_move(*a) for a in args]
+    return list(zip(moves, counts))
+
+
+def run(backend_name, fen, depth, workers=0, check=False):
+    """(nodes, seconds, divide or None)"""
+    start = time.perf_counter()
+    if workers > 1:
+        split = divide(backend_name, fen, depth, workers, check)
+        nodes = sum(count for _, count in split) if depth else 1
+    else:
+        split = None
+        nodes = perft(BACKENDS[backend_name](fen, check), depth)
+    return nodes, time.perf_counter() - start, split
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perft over the standard positions for each move generation backend.")
+    parser.add_argument("depth", type=int, nargs="?", default=3)
+    parser.add_argument("--position", nargs="+", choices=[name for name, _, _ in PERFT_POSITIONS],
+                        help="standard positions to run (default: all)")
+    parser.add_argument("--fen", help="run this position instead of the standard ones")
+    parser.add_argument("--backend", nargs="+", choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument("--divide", action="store_true", help="print the node count below each root move")
+    parser.add_argument("--workers", type=int, default=0, help="split the root moves over this many processes")
+    parser.add_argument("--check", action="store_true", help="verify the bot backends' zobrist keys at every node")
+    args = parser.parse_args(argv)
+
+    if args.fen:
+        positions = [("fen", args.fen, {})]
+    else:
+        positions = [p for p in PERFT_POSITIONS if args.position is None or p[0] in args.position]
+
+    failed = False
+    for name, fen, counts in positions:
+        expected = counts.get(args.depth)
+        for backend_name in args.backend:
+            if args.divide and args.workers <= 1:
+                start = time.perf_counter()
+                split = divide(backend_name, fen, args.depth, check=args.check)
+                nodes = sum(count for _, count in split) if args.depth else 1
+                seconds = time.perf_counter() - start
+            else:
+                nodes, seconds, split = run(backend_name, fen, args.depth, args.workers, args.check)
+
+            if args.divide:
+                for uci, count in split:
+                    print(f"  {uci}: {count}")
+            ok = expected in (None, nodes)
+            failed |= not ok
+            status = "" if expected is None else " ok" if ok else f" MISMATCH (expected {expected})"
+            print(f"{name:10} {backend_name:13} depth {args.depth}: {nodes:>10} nodes{status}  "
+                  f"{seconds:7.2f}s  {nodes / seconds if seconds else 0:>10.0f} nodes/s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())